@@ -1,69 +1,176 @@
-import subprocess
-import gradio as gr
-import pandas as pd
-from apscheduler.schedulers.background import BackgroundScheduler
-from huggingface_hub import snapshot_download
-import os
-
-from src.about import (
-    CITATION_BUTTON_LABEL,
-    CITATION_BUTTON_TEXT,
-    EVALUATION_QUEUE_TEXT,
-    INTRODUCTION_TEXT,
-    LLM_BENCHMARKS_TEXT,
-    TITLE,
-)
-from src.display.css_html_js import custom_css
-from src.display.utils import (
-    BENCHMARK_COLS,
-    COLS,
-    EVAL_COLS,
-    EVAL_TYPES,
-    NUMERIC_INTERVALS,
-    TYPES,
-    AutoEvalColumn,
-    ModelType,
-    fields,
-    WeightType,
-    Precision
-)
-from src.envs import API, EVAL_REQUESTS_PATH, EVAL_RESULTS_PATH, QUEUE_REPO, REPO_ID, RESULTS_REPO, TOKEN
-from src.populate import get_evaluation_queue_df, get_leaderboard_df
-from src.submission.submit import add_new_eval
-
-
-def restart_space():
-    API.restart_space(repo_id=REPO_ID)
-
-try:
-    print(EVAL_REQUESTS_PATH)
-    snapshot_download(
-        repo_id=QUEUE_REPO, local_dir=EVAL_REQUESTS_PATH, repo_type="dataset", tqdm_class=None, etag_timeout=30, token=TOKEN
+import time
+
+from src.timing import StageTimer, timed_imports
+
+# Startup time per imported module and per initialization step, printed before the app is launched
+startup_timer = StageTimer("startup")
+
+with timed_imports(startup_timer):
+    import subprocess
+    import gradio as gr
+    import numpy as np
+    import pandas as pd
+    from apscheduler.schedulers.background import BackgroundScheduler
+    import os
+
+    from src.about import (
+        CITATION_BUTTON_LABEL,
+        CITATION_BUTTON_TEXT,
+        EVALUATION_QUEUE_TEXT,
+        INTRODUCTION_TEXT,
+        LLM_BENCHMARKS_TEXT,
+        TITLE,
     )
-except Exception:
-    restart_space()
-try:
-    print(EVAL_RESULTS_PATH)
-    snapshot_download(
-        repo_id=RESULTS_REPO, local_dir=EVAL_RESULTS_PATH, repo_type="dataset", tqdm_class=None, etag_timeout=30, token=TOKEN
+    from src.display.css_html_js import custom_css
+    from src.display.utils import (
+        COLS,
+        EVAL_COLS,
+        EVAL_TYPES,
+        NUMERIC_INTERVALS,
+        TYPES,
+        AutoEvalColumn,
+        ModelType,
+        fields,
+        WeightType,
+        Precision
+    )
+    from src.envs import (
+        BLOCKING_STARTUP,
+        BOOTSTRAP_RESAMPLES,
+        EVAL_REQUESTS_PATH,
+        EVAL_RESULTS_PATH,
+        INGEST_MANIFEST_PATH,
+        REFRESH_INTERVAL,
+        REQUEST_STATE_PATH,
+        LEADERBOARD_PAGE_SIZE,
+        SNAPSHOT_PATH,
+        TABLE_CACHE_SIZE,
+    )
+    from src.leaderboard.bootstrap import AVERAGE_RANK_INTERVAL_COL, HOLDS_RANK_COL, Bootstrap, interval_col
+    from src.leaderboard.comparison import MAX_COMPARED_MODELS, Comparison, category_deltas, model_labels
+    from src.leaderboard.event_coalescer import EventCoalescer
+    from src.leaderboard.filter_index import FilterIndex
+    from src.leaderboard.generation import DataGeneration, GenerationStore
+    from src.leaderboard.hub_cache import get_hub_status_cache
+    from src.leaderboard.search_index import SearchIndex, parse_query
+    from src.leaderboard.sort_index import RANK_COL, SORTABLE_COLS, ColumnOrder, SortIndex
+    from src.leaderboard.table_cache import TableCache
+    from src.leaderboard.weighting import WEIGHT_PRESETS, WEIGHTED_COL, WeightedRanking, parse_weights
+    from src.leaderboard.snapshot import (
+        empty_frames,
+        is_snapshot_current,
+        load_or_build_snapshot,
+        read_snapshot,
+        read_snapshot_header,
+    )
+    from src.submission.request_index import get_request_index
+    from src.submission.submit import SUBMISSION_INDEX, add_new_eval
+    from src.sync import sync_datasets
+
+
+def build_tables() -> dict:
+    # Read the queue once, it is shared by the leaderboard, the queue tables and the duplicate submission check
+    request_index = get_request_index(EVAL_REQUESTS_PATH, refresh=True, state_path=REQUEST_STATE_PATH)
+    SUBMISSION_INDEX.sync_queue(request_index)
+    # Reuses the snapshot of the tables when the result and request files and hub statuses did not change since it
+    # was built
+    return load_or_build_snapshot(EVAL_RESULTS_PATH, EVAL_REQUESTS_PATH, SNAPSHOT_PATH, INGEST_MANIFEST_PATH)
+
+
+def sync_data() -> list:
+    """Syncs the datasets and revalidates a batch of stale hub statuses in the background. When no file changed but
+    a previous revalidation changed what the board shows, the hub status cache is reported as changed."""
+    changed_paths = sync_datasets()
+    hub_cache = get_hub_status_cache()
+    hub_cache.start_revalidation()
+    if len(changed_paths) == 0 and not is_snapshot_current(EVAL_RESULTS_PATH, EVAL_REQUESTS_PATH, SNAPSHOT_PATH):
+        changed_paths.append(hub_cache.path)
+    return changed_paths
+
+
+# The tables are reloaded in the background every REFRESH_INTERVAL seconds, see load_generation for the UI side
+data_store = GenerationStore(build_tables, sync_data, REFRESH_INTERVAL)
+data_store.add_derived("filter_index", lambda generation: FilterIndex(generation.leaderboard_df))
+data_store.add_derived("search_index", lambda generation: SearchIndex.from_df(generation.leaderboard_df))
+data_store.add_derived("sort_index", lambda generation: SortIndex(generation.leaderboard_df))
+data_store.add_derived("comparison", lambda generation: Comparison(generation.scores_df.to_numpy(dtype=float)))
+if BOOTSTRAP_RESAMPLES > 0:
+    data_store.add_derived(
+        "bootstrap", lambda generation: Bootstrap(generation.scores_df.to_numpy(dtype=float), BOOTSTRAP_RESAMPLES)
+    )
+data_store.add_derived("weighted_ranking", lambda generation: WeightedRanking(generation.scores_df.to_numpy(dtype=float)))
+# Rows of the most recent filter and search combinations, shared by all sessions and dropped when a new
+# generation is served
+table_cache = TableCache(TABLE_CACHE_SIZE)
+# Only the latest table update of each session is computed, see coalesced
+table_events = EventCoalescer()
+with startup_timer.stage("load data"):
+    last_snapshot = None if BLOCKING_STARTUP else read_snapshot(SNAPSHOT_PATH)
+    if last_snapshot is None:
+        # Nothing to serve yet, wait for the first sync and build
+        data_store.refresh()
+    else:
+        # Serve the tables of the previous run right away, even if they are stale, and catch up in the background
+        print(f"Serving the last leaderboard snapshot from {SNAPSHOT_PATH} while syncing")
+        data_store.publish(last_snapshot, read_snapshot_header(SNAPSHOT_PATH)["created_at"])
+        data_store.refresh_in_background()
+    if data_store.current() is None:
+        # Neither the datasets nor the local files could be read: start with an empty board, the scheduled refreshes
+        # keep trying
+        print("No leaderboard data could be loaded, serving an empty leaderboard until a refresh succeeds")
+        data_store.publish_empty(empty_frames())
+
+generation = data_store.current()
+leaderboard_df = generation.leaderboard_df
+
+finished_eval_queue_df = generation.finished_eval_queue_df
+running_eval_queue_df = generation.running_eval_queue_df
+pending_eval_queue_df = generation.pending_eval_queue_df
+
+
+def data_status() -> str:
+    status = data_store.status()
+    if status["last_success_at"] is None:
+        text = f"No data could be loaded yet, it is retried every {status['refresh_interval'] // 60} minutes."
+    elif status["as_of"] is None:
+        text = "Data from the local files, the datasets could not be synced yet."
+    else:
+        as_of = time.strftime("%Y-%m-%d %H:%M UTC", time.gmtime(status["as_of"]))
+        text = f"Data as of {as_of}, refreshed every {status['refresh_interval'] // 60} minutes."
+    if status["refreshing"]:
+        text += " An update is in progress, reload the page in a moment to see it."
+    elif status["last_error"] is not None and status["as_of"] is not None:
+        text += " The last refresh failed, showing the previous data."
+    return text
+
+
+def load_generation(request: gr.Request):
+    """Fills a newly opened page with the current data generation. Searching and filtering always work on the
+    current generation, see update_table. A `weights` URL parameter (a preset name or a spec such as RM=3,QA=2)
+    opens the table sorted by that weighted average."""
+    generation = data_store.current()
+    weights = valid_weights(request.query_params.get("weights", "") if request else "")
+    sort_by = WEIGHTED_COL if weights else DEFAULT_SORT_COL
+    rows = filtered_rows(generation, ["All"], ["All"], ["All"], True, "", sort_by, DEFAULT_SORT_ORDER, weights)
+    window, page, page_info = page_window(rows, 0, sort_state(sort_by, DEFAULT_SORT_ORDER, weights))
+    return (
+        table_view(generation, window, DEFAULT_DISPLAYED_COLS, sort_by, DEFAULT_SORT_ORDER, weights),
+        page,
+        page_info,
+        weights,
+        sort_by,
+        gr.Accordion(label=f"✅ Finished Evaluations ({len(generation.finished_eval_queue_df)})"),
+        generation.finished_eval_queue_df,
+        gr.Accordion(label=f"🔄 Running Evaluation Queue ({len(generation.running_eval_queue_df)})"),
+        generation.running_eval_queue_df,
+        gr.Accordion(label=f"⏳ Pending Evaluation Queue ({len(generation.pending_eval_queue_df)})"),
+        generation.pending_eval_queue_df,
+        data_status(),
     )
-except Exception:
-    restart_space()
-
-
-raw_data, original_df = get_leaderboard_df(EVAL_RESULTS_PATH, EVAL_REQUESTS_PATH, COLS, BENCHMARK_COLS)
-leaderboard_df = original_df.copy()
-
-(
-    finished_eval_queue_df,
-    running_eval_queue_df,
-    pending_eval_queue_df,
-) = get_evaluation_queue_df(EVAL_REQUESTS_PATH, EVAL_COLS)
 
 
 # Searching and filtering
 def update_table(
-    hidden_df: pd.DataFrame,
     columns_info: list,
     columns_IE: list,
     columns_TA: list,
@@ -79,21 +186,206 @@ def update_table(
     size_query: list,
     show_deleted: bool,
     query: str,
+    sort_by: str = AutoEvalColumn.average.name,
+    sort_order: str = "Descending",
+    weights: str = "",
+    show_intervals: bool = False,
+    page: int = 0,
 ):
+    """The requested page of the filtered table sorted by the given column, the page number after clamping and the
+    paging summary. The weights (see parse_weights) are used when sorting by the weighted average, show_intervals
+    adds the bootstrap confidence intervals of the averages."""
     # Combine all column selections
     selected_columns = (
         columns_info + columns_IE + columns_TA + columns_QA + columns_TG +
         columns_RM + columns_FO + columns_DM + columns_spanish + columns_other
     )
-    # Filter models based on queries
-    filtered_df = filter_models(hidden_df, type_query, size_query, precision_query, show_deleted)
-    filtered_df = filter_queries(query, filtered_df)
-    df = select_columns(filtered_df, selected_columns)
-    return df
+    # Filter models based on queries, on the data generation current when the event arrived
+    generation = data_store.current()
+    weights = valid_weights(weights)
+    rows = filtered_rows(
+        generation, type_query, precision_query, size_query, show_deleted, query, sort_by, sort_order, weights
+    )
+    window, page, page_info = page_window(rows, page, sort_state(sort_by, sort_order, weights))
+    df = table_view(generation, window, selected_columns, sort_by, sort_order, weights, show_intervals)
+    return df, page, page_info
+
+
+def previous_page(*args):
+    return update_table(*args[:-1], page=args[-1] - 1)
+
+
+def next_page(*args):
+    return update_table(*args[:-1], page=args[-1] + 1)
+
+
+def take_ticket(request: gr.Request) -> int:
+    """Registers a table update as soon as it is triggered, before it waits in the queue"""
+    return table_events.register(request.session_hash)
+
+
+def coalesced(update):
+    """Runs a table update with the ticket taken by take_ticket as last input, unless the session triggered a newer
+    one meanwhile. The table, page and summary are then left as they are, the newer update fills them."""
+    def run(request: gr.Request, *args):
+        *inputs, ticket = args
+        session, ticket = request.session_hash, int(ticket)
+        if not table_events.is_latest(session, ticket):
+            table_events.finish(session, ticket, "skipped")
+            return gr.skip(), gr.skip(), gr.skip()
+        try:
+            outputs = update(*inputs)
+        except Exception:
+            table_events.finish(session, ticket, "failed")
+            raise
+        if not table_events.is_latest(session, ticket):
+            table_events.finish(session, ticket, "discarded")
+            return gr.skip(), gr.skip(), gr.skip()
+        table_events.finish(session, ticket, "completed")
+        return outputs
+
+    return run
+
+
+def close_session(request: gr.Request):
+    table_events.close(request.session_hash)
+
+
+def report_table_events():
+    print(f"[table events] {table_events.stats()}")
+
+
+def report_table_cache():
+    print(f"[table cache] generation {table_cache.generation_id}: {table_cache.stats()}")
+
+
+def filtered_rows(
+    generation: DataGeneration,
+    type_query: list,
+    precision_query: list,
+    size_query: list,
+    show_deleted: bool,
+    query: str,
+    sort_by: str,
+    sort_order: str,
+    weights: str,
+) -> np.ndarray:
+    """Positions of the rows kept by the filters and the search in the requested order, cached so that paging and
+    column changes reuse them. The order of the selections does not change the rows, so they are sorted for the
+    cache key."""
+    key = (
+        tuple(sorted(type_query)),
+        tuple(sorted(precision_query)),
+        tuple(sorted(size_query)),
+        bool(show_deleted),
+        ";".join(parse_query(query.lower())),
+        sort_by,
+        sort_order,
+        tuple(parse_weights(weights)) if sort_by == WEIGHTED_COL else None,
+    )
+
+    def compute():
+        rows = filter_models(generation, type_query, size_query, precision_query, show_deleted)
+        rows = filter_queries(query, generation, rows)
+        return column_order(generation, sort_by, weights).order(rows, sort_order == "Descending")
+
+    return table_cache.get_or_compute(generation.id, key, compute)
+
+
+def valid_weights(weights: str) -> str:
+    """The weights spec of the selector or URL parameter, empty (all weights equal) when it is invalid"""
+    weights = (weights or "").strip()
+    try:
+        parse_weights(weights)
+    except ValueError as e:
+        gr.Warning(f"{e}. The weighted average uses equal weights.")
+        return ""
+    return weights
+
+
+def column_order(generation: DataGeneration, sort_by: str, weights: str) -> ColumnOrder:
+    """Order of the rows by a leaderboard column or by the weighted average of the given weights. Weighted
+    averages other than the presets are cached like filtered rows."""
+    if sort_by != WEIGHTED_COL:
+        return generation.derived["sort_index"].columns[sort_by]
+    ranking = generation.derived["weighted_ranking"]
+    task_weights = tuple(parse_weights(weights))
+    if task_weights in ranking.presets:
+        return ranking.presets[task_weights]
+    return table_cache.get_or_compute(
+        generation.id, ("weights", task_weights), lambda: ranking.ranking(np.array(task_weights))
+    )
+
+
+def sort_state(sort_by: str, sort_order: str, weights: str) -> str:
+    state = f"sorted by {sort_by} ({sort_order.lower()})"
+    if sort_by == WEIGHTED_COL:
+        state += f" with weights {weights or 'all equal'}"
+    return state
+
+
+def sort_for_weights(weights: str, sort_by: str) -> str:
+    """Sorts by the weighted average when weights are chosen, and back by Average when they are cleared"""
+    if (weights or "").strip() != "":
+        return WEIGHTED_COL
+    return DEFAULT_SORT_COL if sort_by == WEIGHTED_COL else sort_by
+
+
+def page_window(rows: np.ndarray, page: int, sort_state: str) -> tuple:
+    """Rows of the given page (all of them without LEADERBOARD_PAGE_SIZE), the clamped page and its summary"""
+    if len(rows) == 0:
+        return rows, 0, "No model matches these filters."
+    if LEADERBOARD_PAGE_SIZE <= 0:
+        return rows, 0, f"{len(rows)} models, {sort_state}."
+
+    num_pages = (len(rows) + LEADERBOARD_PAGE_SIZE - 1) // LEADERBOARD_PAGE_SIZE
+    page = min(max(int(page), 0), num_pages - 1)
+    start = page * LEADERBOARD_PAGE_SIZE
+    end = min(start + LEADERBOARD_PAGE_SIZE, len(rows))
+    page_info = f"Models {start + 1}-{end} of {len(rows)} (page {page + 1} of {num_pages}), {sort_state}."
+    return rows[start:end], page, page_info
 
 
-def search_table(df: pd.DataFrame, query: str) -> pd.DataFrame:
-    return df[(df[AutoEvalColumn.model.name].str.contains(query, case=False))]
+def table_view(
+    generation: DataGeneration,
+    window: np.ndarray,
+    columns: list,
+    sort_by: str,
+    sort_order: str,
+    weights: str,
+    show_intervals: bool = False,
+) -> pd.DataFrame:
+    """The shown columns of the rows of a page, after their rank by the sort column among all the models.
+    When sorting by the weighted average, it is shown next to Average."""
+    df = select_columns(generation.leaderboard_df.iloc[window], columns)
+    shown_columns = [RANK_COL] + list(df.columns)
+    order = column_order(generation, sort_by, weights)
+    df = df.assign(**{RANK_COL: order.rank(window, sort_order == "Descending").to_numpy()})
+    if sort_by == WEIGHTED_COL:
+        df[WEIGHTED_COL] = order.values[window]
+        after = AutoEvalColumn.average.name if AutoEvalColumn.average.name in shown_columns else AutoEvalColumn.model.name
+        shown_columns.insert(shown_columns.index(after) + 1, WEIGHTED_COL)
+    if show_intervals and "bootstrap" in generation.derived:
+        add_intervals(generation.derived["bootstrap"], df, shown_columns, window)
+    return df[shown_columns]
+
+
+def add_intervals(bootstrap: Bootstrap, df: pd.DataFrame, shown_columns: list, window: np.ndarray):
+    """Adds the confidence interval of each shown average column after it, then the rank interval and the rank
+    holding probability after the interval of Average"""
+    for column, (lows, highs) in bootstrap.intervals.items():
+        if column in shown_columns:
+            df[interval_col(column)] = [f"{low:.2f} – {high:.2f}" for low, high in zip(lows[window], highs[window])]
+            shown_columns.insert(shown_columns.index(column) + 1, interval_col(column))
+
+    lows, highs = bootstrap.rank_intervals
+    df[AVERAGE_RANK_INTERVAL_COL] = [
+        f"{int(low) + 1} – {int(high) + 1}" for low, high in zip(lows[window], highs[window])
+    ]
+    df[HOLDS_RANK_COL] = (bootstrap.holds_rank[window] * 100).round(decimals=1)
+    after = interval_col(AutoEvalColumn.average.name)
+    position = shown_columns.index(after if after in shown_columns else AutoEvalColumn.model.name) + 1
+    shown_columns[position:position] = [AVERAGE_RANK_INTERVAL_COL, HOLDS_RANK_COL]
 
 
 def select_columns(df: pd.DataFrame, columns: list) -> pd.DataFrame:
@@ -116,58 +408,79 @@ def select_columns(df: pd.DataFrame, columns: list) -> pd.DataFrame:
 
 
 
-def filter_queries(query: str, filtered_df: pd.DataFrame) -> pd.DataFrame:
-    final_df = []
-    if query != "":
-        queries = [q.strip() for q in query.split(";")]
-        for _q in queries:
-            _q = _q.strip()
-            if _q != "":
-                temp_filtered_df = search_table(filtered_df, _q)
-                if len(temp_filtered_df) > 0:
-                    final_df.append(temp_filtered_df)
-        if len(final_df) > 0:
-            filtered_df = pd.concat(final_df)
-            filtered_df = filtered_df.drop_duplicates(
-                subset=[AutoEvalColumn.model.name, AutoEvalColumn.precision.name, AutoEvalColumn.revision.name]
-            )
-
-    return filtered_df
+def filter_queries(query: str, generation: DataGeneration, rows: np.ndarray) -> np.ndarray:
+    """Keeps the rows matching any of the `;` separated terms of the query, or all of them if none matches"""
+    if query == "":
+        return rows
+    matched_rows = rows[generation.derived["search_index"].search(query)[rows]]
+    return matched_rows if len(matched_rows) > 0 else rows
 
 
 def filter_models(
-    df: pd.DataFrame, type_query: list, size_query: list, precision_query: list, show_deleted: bool
-) -> pd.DataFrame:
-    # Show all models
-    if show_deleted:
-        filtered_df = df
-    else:
-        filtered_df = df[df[AutoEvalColumn.still_on_hub.name] == True]
-
-    if "All" not in type_query:
-        if "?" in type_query:
-            filtered_df = filtered_df.loc[~df[AutoEvalColumn.model_type_symbol.name].isin([t for t in ModelType if t != "?"])]
-        else:
-            type_emoji = [t[0] for t in type_query]
-            filtered_df = filtered_df.loc[df[AutoEvalColumn.model_type_symbol.name].isin(type_emoji)]
-
-    if "All" not in precision_query:
-        if "?" in precision_query:
-            filtered_df = filtered_df.loc[df[AutoEvalColumn.precision.name].isna()]
-        else:
-            filtered_df = filtered_df.loc[df[AutoEvalColumn.precision.name].isin(precision_query + ["None"])]
-
-    if "All" not in size_query:
-        if "?" in size_query:
-            filtered_df = filtered_df.loc[df[AutoEvalColumn.params.name].isna()]
-        else:
-            numeric_interval = pd.IntervalIndex(sorted([NUMERIC_INTERVALS[s] for s in size_query]))
-            params_column = pd.to_numeric(df[AutoEvalColumn.params.name], errors="coerce")
-            mask = params_column.apply(lambda x: any(numeric_interval.contains(x)))
-            filtered_df = filtered_df.loc[mask]
+    generation: DataGeneration, type_query: list, size_query: list, precision_query: list, show_deleted: bool
+) -> np.ndarray:
+    return generation.derived["filter_index"].filter(type_query, size_query, precision_query, show_deleted)
+
+
+# Head-to-head comparisons
+def compare_models(query: str):
+    """Pairwise win rates and category deltas of the models matching the `;` separated search terms of the query,
+    or the win rate of every model against the whole board when it is empty. Cached per data generation."""
+    generation = data_store.current()
+    if query.strip() == "":
+        return table_cache.get_or_compute(generation.id, ("compare",), lambda: board_comparison(generation))
+
+    matched_rows = np.flatnonzero(generation.derived["search_index"].search(query))
+    if len(matched_rows) == 0:
+        return "No model matches this search.", None, None
+    # Table order is by Average, so the cap keeps the best models
+    rows = matched_rows[:MAX_COMPARED_MODELS]
+    summary, win_rates, deltas = table_cache.get_or_compute(
+        generation.id, ("compare", tuple(rows)), lambda: head_to_head_comparison(generation, rows)
+    )
+    if len(matched_rows) > len(rows):
+        summary = f"{len(matched_rows)} models match, comparing the best {len(rows)} by Average. " + summary
+    return summary, win_rates, deltas
+
+
+def board_comparison(generation: DataGeneration) -> tuple:
+    comparison = generation.derived["comparison"]
+    win_rates = comparison.board_win_rates()
+    rows = ColumnOrder(win_rates).top_k(np.arange(len(win_rates)), MAX_COMPARED_MODELS)
+    board = pd.DataFrame({
+        AutoEvalColumn.model.name: model_labels(generation.leaderboard_df.iloc[rows]),
+        "Win rate (%)": (win_rates[rows] * 100).round(decimals=1),
+        "Wins": comparison.board_wins[rows],
+        "Ties": comparison.board_ties[rows],
+        "Comparisons": comparison.board_comparisons[rows],
+    })
+    summary = (
+        f"Win rate of the best {len(rows)} of {len(win_rates)} models against all the others, over the tasks each "
+        "pair shares. Ties count as half a win. Search for models to compare them pair by pair."
+    )
+    return summary, board, None
+
+
+def head_to_head_comparison(generation: DataGeneration, rows: np.ndarray) -> tuple:
+    df = generation.leaderboard_df
+    labels = model_labels(df.iloc[rows])
+    win_rates = generation.derived["comparison"].head_to_head(rows)["win_rates"]
+    win_rate_df = pd.DataFrame((win_rates * 100).round(decimals=1), columns=labels)
+    win_rate_df.insert(0, AutoEvalColumn.model.name, labels)
+    deltas = category_deltas(df, rows)
+    deltas.insert(0, AutoEvalColumn.model.name, labels)
+    summary = (
+        f"Win rate (%) of each row model against each column model over the tasks both have, ties count as half a "
+        f"win. Category deltas are against {labels[0]}, the best of the {len(rows)} models by Average."
+    )
+    return summary, win_rate_df, deltas
 
-    return filtered_df
 
+DEFAULT_DISPLAYED_COLS = [c.name for c in fields(AutoEvalColumn) if c.never_hidden] + [
+    c.name for c in fields(AutoEvalColumn) if c.displayed_by_default and not c.never_hidden
+]
+DEFAULT_SORT_COL = AutoEvalColumn.average.name
+DEFAULT_SORT_ORDER = "Descending"
 
 
 def uncheck_all():
@@ -177,6 +490,7 @@ def uncheck_all():
 logos_dir = "logos"
 logo_files = [f for f in os.listdir(logos_dir) if f.endswith(('.png', '.jpg', '.jpeg'))]
 
+ui_start = time.perf_counter()
 demo = gr.Blocks(css=custom_css)
 with demo:
     gr.HTML(TITLE)
@@ -188,7 +502,7 @@ with demo:
                 with gr.Column():
                     with gr.Row():
                         search_bar = gr.Textbox(
-                            placeholder=" 🔍 Search for your model (separate multiple queries with `;`) and press ENTER...",
+                            placeholder=" 🔍 Search for your model (separate multiple queries with `;`, start one with `^` to match the beginning of a word or `~` for close spellings) and press ENTER...",
                             show_label=False,
                             elem_id="search-bar",
                         )
@@ -287,6 +601,12 @@ with demo:
                         deleted_models_visibility = gr.Checkbox(
                             value=True, label="Show gated/private/deleted models", interactive=True
                         )
+                        show_intervals = gr.Checkbox(
+                            value=False,
+                            label="Show 95% confidence intervals (bootstrap over tasks)",
+                            interactive=True,
+                            visible=BOOTSTRAP_RESAMPLES > 0,
+                        )
                 with gr.Column(min_width=320):
                     #with gr.Box(elem_id="box-filter"):
                     filter_columns_type = gr.CheckboxGroup(
@@ -310,51 +630,94 @@ with demo:
                         interactive=True,
                         elem_id="filter-columns-size",
                     )
+                    with gr.Row():
+                        sort_by = gr.Dropdown(
+                            label="Sort by",
+                            choices=[DEFAULT_SORT_COL, WEIGHTED_COL] + [c for c in SORTABLE_COLS if c != DEFAULT_SORT_COL],
+                            value=DEFAULT_SORT_COL,
+                            interactive=True,
+                            elem_id="sort-by",
+                        )
+                        sort_order = gr.Radio(
+                            label="Order",
+                            choices=["Descending", "Ascending"],
+                            value=DEFAULT_SORT_ORDER,
+                            interactive=True,
+                        )
+                    weights_input = gr.Dropdown(
+                        label="Task weights",
+                        info="A preset, or weights such as RM=3, FinQA=2 for categories or tasks, the others weigh 1",
+                        choices=list(WEIGHT_PRESETS),
+                        value=None,
+                        allow_custom_value=True,
+                        interactive=True,
+                        elem_id="task-weights",
+                    )
 
 
+            # Filled by load_generation when the page opens, an initial value would be sent a second time
             leaderboard_table = gr.Dataframe(
-                value=leaderboard_df[
-                    [c.name for c in fields(AutoEvalColumn) if c.never_hidden]
-                    + [c.name for c in fields(AutoEvalColumn) if c.displayed_by_default and not c.never_hidden]
+                value=leaderboard_df[DEFAULT_DISPLAYED_COLS].head(0).assign(**{RANK_COL: []})[
+                    [RANK_COL] + DEFAULT_DISPLAYED_COLS
                 ],
-                headers=[c.name for c in fields(AutoEvalColumn) if c.never_hidden]
-                        + [c.name for c in fields(AutoEvalColumn) if c.displayed_by_default and not c.never_hidden],
-                datatype=TYPES,
+                headers=[RANK_COL] + DEFAULT_DISPLAYED_COLS,
+                datatype=["number"] + TYPES,
                 elem_id="leaderboard-table",
                 interactive=False,
                 visible=True,
             )
+            with gr.Row(equal_height=True):
+                previous_page_button = gr.Button("◀ Previous", size="sm", visible=LEADERBOARD_PAGE_SIZE > 0)
+                page_info = gr.Markdown(elem_classes="markdown-text")
+                next_page_button = gr.Button("Next ▶", size="sm", visible=LEADERBOARD_PAGE_SIZE > 0)
+            # Page shown to this session, the filtered rows it is cut from are cached on the server
+            page_state = gr.State(0)
+            # Ticket of the latest table update triggered by this session. A hidden component rather than a gr.State:
+            # its value is sent with each event when it is triggered, while a state is read when the queued update
+            # runs, and would always hold the newest ticket.
+            ticket_number = gr.Number(0, precision=0, visible=False)
+            data_status_text = gr.Markdown(data_status(), elem_classes="markdown-text")
+
+            table_inputs = [
+                shown_columns_info,
+                shown_columns_IE,
+                shown_columns_TA,
+                shown_columns_QA,
+                shown_columns_TG,
+                shown_columns_RM,
+                shown_columns_FO,
+                shown_columns_DM,
+                shown_columns_spanish,
+                shown_columns_other,
+                filter_columns_type,
+                filter_columns_precision,
+                filter_columns_size,
+                deleted_models_visibility,
+                search_bar,
+                sort_by,
+                sort_order,
+                weights_input,
+                show_intervals,
+            ]
+            table_outputs = [leaderboard_table, page_state, page_info]
+
+            def on_table_event(trigger, update, inputs):
+                # The ticket is taken outside of the queue, so that queued updates can tell they are superseded
+                trigger(take_ticket, inputs=None, outputs=ticket_number, queue=False).then(
+                    coalesced(update), inputs=inputs + [ticket_number], outputs=table_outputs, queue=True
+                )
 
-
-            # Dummy leaderboard for handling the case when the user uses backspace key
-            hidden_leaderboard_table_for_search = gr.Dataframe(
-                value=original_df[COLS],
-                headers=COLS,
-                datatype=TYPES,
-                visible=False,
-            )
-            search_bar.submit(
-                update_table,
-                inputs=[
-                    hidden_leaderboard_table_for_search,
-                    shown_columns_info,
-                    shown_columns_IE,
-                    shown_columns_TA,
-                    shown_columns_QA,
-                    shown_columns_TG,
-                    shown_columns_RM,
-                    shown_columns_FO,
-                    shown_columns_DM,
-                    shown_columns_spanish,
-                    shown_columns_other,
-                    filter_columns_type,
-                    filter_columns_precision,
-                    filter_columns_size,
-                    deleted_models_visibility,
-                    search_bar,
-                ],
-                outputs=leaderboard_table,
-            )
+            # A new search, filter or sort starts again from the first page, showing other columns keeps the page
+            on_table_event(search_bar.submit, update_table, table_inputs)
+            for selector in [
+                filter_columns_type, filter_columns_precision,
+                filter_columns_size, deleted_models_visibility,
+                sort_by, sort_order,
+            ]:
+                on_table_event(selector.change, update_table, table_inputs)
+            # Choosing weights also sorts by the weighted average, clearing them goes back to Average
+            weights_input.change(sort_for_weights, inputs=[weights_input, sort_by], outputs=sort_by, queue=False)
+            on_table_event(weights_input.change, update_table, table_inputs)
             for selector in [
                 shown_columns_info,
                 shown_columns_IE,
@@ -366,32 +729,29 @@ with demo:
                 shown_columns_DM,
                 shown_columns_spanish,
                 shown_columns_other,
-                filter_columns_type, filter_columns_precision, 
-                filter_columns_size, deleted_models_visibility
+                show_intervals,
             ]:
-                selector.change(
-                    update_table,
-                    inputs=[
-                        hidden_leaderboard_table_for_search,
-                        shown_columns_info,
-                        shown_columns_IE,
-                        shown_columns_TA,
-                        shown_columns_QA,
-                        shown_columns_TG,
-                        shown_columns_RM,
-                        shown_columns_FO,
-                        shown_columns_DM,
-                        shown_columns_spanish,
-                        shown_columns_other,
-                        filter_columns_type,
-                        filter_columns_precision,
-                        filter_columns_size,
-                        deleted_models_visibility,
-                        search_bar,
-                    ],
-                    outputs=leaderboard_table,
-                    queue=True,
-                )
+                on_table_event(selector.change, update_table, table_inputs + [page_state])
+            on_table_event(previous_page_button.click, previous_page, table_inputs + [page_state])
+            on_table_event(next_page_button.click, next_page, table_inputs + [page_state])
+
+        with gr.TabItem("⚔️ Compare", elem_id="llm-benchmark-tab-table", id=1):
+            compare_query = gr.Textbox(
+                placeholder=" 🔍 Models to compare, as search terms separated by `;` (empty for the whole board), and press ENTER...",
+                show_label=False,
+                elem_id="compare-search-bar",
+            )
+            compare_summary = gr.Markdown(elem_classes="markdown-text")
+            win_rate_table = gr.Dataframe(label="Win rates (%)", interactive=False, elem_id="win-rate-table")
+            category_delta_table = gr.Dataframe(
+                label="Category average deltas", interactive=False, elem_id="category-delta-table"
+            )
+            compare_query.submit(
+                compare_models,
+                inputs=compare_query,
+                outputs=[compare_summary, win_rate_table, category_delta_table],
+                api_name="compare",
+            )
 
         with gr.TabItem("📝 About", elem_id="llm-benchmark-tab-table", id=2):
             gr.Markdown(LLM_BENCHMARKS_TEXT, elem_classes="markdown-text")
@@ -405,7 +765,7 @@ with demo:
                     with gr.Accordion(
                         f"✅ Finished Evaluations ({len(finished_eval_queue_df)})",
                         open=False,
-                    ):
+                    ) as finished_eval_accordion:
                         with gr.Row():
                             finished_eval_table = gr.Dataframe(
                                 value=finished_eval_queue_df,
@@ -416,7 +776,7 @@ with demo:
                     with gr.Accordion(
                         f"🔄 Running Evaluation Queue ({len(running_eval_queue_df)})",
                         open=False,
-                    ):
+                    ) as running_eval_accordion:
                         with gr.Row():
                             running_eval_table = gr.Dataframe(
                                 value=running_eval_queue_df,
@@ -428,7 +788,7 @@ with demo:
                     with gr.Accordion(
                         f"⏳ Pending Evaluation Queue ({len(pending_eval_queue_df)})",
                         open=False,
-                    ):
+                    ) as pending_eval_accordion:
                         with gr.Row():
                             pending_eval_table = gr.Dataframe(
                                 value=pending_eval_queue_df,
@@ -499,7 +859,32 @@ with demo:
                 show_copy_button=True,
             )
 
+    demo.unload(close_session)
+    demo.load(
+        load_generation,
+        inputs=None,
+        outputs=[
+            leaderboard_table,
+            page_state,
+            page_info,
+            weights_input,
+            sort_by,
+            finished_eval_accordion,
+            finished_eval_table,
+            running_eval_accordion,
+            running_eval_table,
+            pending_eval_accordion,
+            pending_eval_table,
+            data_status_text,
+        ],
+    )
+
+startup_timer.add("build ui", time.perf_counter() - ui_start)
+startup_timer.report()
+
 scheduler = BackgroundScheduler()
-scheduler.add_job(restart_space, "interval", seconds=1800)
+scheduler.add_job(data_store.refresh, "interval", seconds=REFRESH_INTERVAL)
+scheduler.add_job(report_table_events, "interval", seconds=REFRESH_INTERVAL)
+scheduler.add_job(report_table_cache, "interval", seconds=REFRESH_INTERVAL)
 scheduler.start()
 demo.queue(default_concurrency_limit=40).launch()
@@ -0,0 +1,38 @@
+"""Build time and peak memory of the bootstrap confidence intervals for many synthetic models.
+
+The intervals are computed once per data generation, before it is served, so this is added to every refresh of
+the data. Run from the root of the repository:
+
+    python -m benchmarks.bench_bootstrap --models 10000 --resamples 1000
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.bench_eval_result import synthetic_scores
+from src.display.utils import AutoEvalColumn
+from src.leaderboard.bootstrap import Bootstrap
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", type=int, nargs="+", default=[1000, 3000, 10000])
+    parser.add_argument("--resamples", type=int, default=1000)
+    args = parser.parse_args()
+
+    for num_models in args.models:
+        scores = synthetic_scores(num_models)
+        tracemalloc.start()
+        start = time.perf_counter()
+        bootstrap = Bootstrap(scores, args.resamples)
+        duration = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        low, high = bootstrap.intervals[AutoEvalColumn.average.name]
+        print(
+            f"{num_models:6d} models x {args.resamples} resamples: {duration:6.2f}s, peak {peak / 1e6:7.1f}MB, "
+            f"median Average CI width {np.median(high - low):.2f}, "
+            f"median rank holding {np.median(bootstrap.holds_rank) * 100:.1f}%"
+        )
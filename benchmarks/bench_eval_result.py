@@ -0,0 +1,142 @@
+"""Memory and leaderboard build time of EvalResult for many synthetic models.
+
+Compares the array-backed EvalResult with the previous representation, where scores were kept in a dict keyed
+by benchmark with a "missing" string marker. Run from the root of the repository:
+
+    python -m benchmarks.bench_eval_result --models 20000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.display.utils import AutoEvalColumn, ModelType, Precision, Tasks, WeightType
+from src.leaderboard.read_evals import EvalResult
+from src.leaderboard.scores import CATEGORY_AVERAGE_COLS, MCC_TASKS, TASKS, score_columns, score_matrix
+from src.populate import ENUM_COLUMNS
+
+
+@dataclass
+class DictEvalResult:
+    """EvalResult as it was before: a regular dataclass with a dict of scores"""
+    eval_name: str
+    full_model: str
+    org: str
+    model: str
+    revision: str
+    results: dict
+    precision: Precision = Precision.Unknown
+    model_type: ModelType = ModelType.Unknown
+    weight_type: WeightType = WeightType.Original
+    architecture: str = "Unknown"
+    license: str = "?"
+    likes: int = 0
+    num_params: int = 0
+    date: str = ""
+    still_on_hub: bool = False
+
+
+def synthetic_scores(num_models: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    scores = rng.uniform(0, 100, size=(num_models, len(TASKS)))
+    scores[:, MCC_TASKS] = rng.uniform(-100, 100, size=(num_models, MCC_TASKS.sum()))
+    scores[(rng.random(scores.shape) < 0.05) & ~MCC_TASKS] = np.nan
+    return scores
+
+
+def build_array_results(scores: np.ndarray) -> list:
+    return [
+        EvalResult(
+            eval_name=f"org_model-{i}_float16",
+            full_model=f"org/model-{i}",
+            org="org",
+            model=f"model-{i}",
+            revision="main",
+            scores=row.copy(),
+            precision=Precision.float16,
+        )
+        for i, row in enumerate(scores)
+    ]
+
+
+def build_dict_results(scores: np.ndarray) -> list:
+    benchmarks = [task.benchmark for task in TASKS]
+    return [
+        DictEvalResult(
+            eval_name=f"org_model-{i}_float16",
+            full_model=f"org/model-{i}",
+            org="org",
+            model=f"model-{i}",
+            revision="main",
+            results={b: "missing" if np.isnan(v) else float(v) for b, v in zip(benchmarks, row)},
+            precision=Precision.float16,
+        )
+        for i, row in enumerate(scores)
+    ]
+
+
+def dict_frame(eval_results: list) -> pd.DataFrame:
+    """Per-model Python averaging and record-wise frame construction, as the leaderboard was built before"""
+    category_of = {task.benchmark: task.category for task in TASKS}
+    rows = []
+    for eval_result in eval_results:
+        categories = {}
+        for task in Tasks:
+            score = eval_result.results.get(task.value.benchmark)
+            if score == "missing":
+                continue
+            if task.value.metric == "MCC":
+                score = (score + 100) / 2
+            categories.setdefault(category_of[task.value.benchmark], []).append(score)
+        row = {f"average {c}": sum(v) / len(v) for c, v in categories.items()}
+        valid = [v for v in eval_result.results.values() if v != "missing"]
+        row[AutoEvalColumn.average.name] = sum(valid) / len(valid) if valid else 0
+        row[AutoEvalColumn.precision.name] = eval_result.precision.value.name
+        for task in Tasks:
+            row[task.value.col_name] = eval_result.results.get(task.value.benchmark)
+        rows.append(row)
+    return pd.DataFrame.from_records(rows)
+
+
+def array_frame(eval_results: list) -> pd.DataFrame:
+    df = pd.DataFrame(score_columns(score_matrix(eval_results)))
+    df[AutoEvalColumn.precision.name] = pd.Categorical(
+        [r.precision.value.name for r in eval_results], categories=ENUM_COLUMNS[AutoEvalColumn.precision.name]
+    )
+    return df
+
+
+def measure(build, *args):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build(*args)
+    duration = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, duration, size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", type=int, default=10000)
+    args = parser.parse_args()
+
+    scores = synthetic_scores(args.models)
+    print(f"{args.models} models x {len(TASKS)} tasks, {len(CATEGORY_AVERAGE_COLS)} categories")
+    for name, build_results, build_frame in [
+        ("dict", build_dict_results, dict_frame),
+        ("array", build_array_results, array_frame),
+    ]:
+        eval_results, _, results_size = measure(build_results, scores)
+        start = time.perf_counter()
+        build_frame(eval_results)
+        frame_duration = time.perf_counter() - start
+        print(
+            f"{name:>5}: {results_size / 1e6:7.1f}MB of EvalResults ({results_size / args.models:6.0f}B per model), "
+            f"frame built in {frame_duration * 1000:7.1f}ms"
+        )
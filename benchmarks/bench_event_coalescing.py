@@ -0,0 +1,161 @@
+"""Table updates of one session queued in gradio: only the latest one is computed.
+
+The app is imported on a synthetic dataset and driven in-process through the gradio queue, the way the browser does
+it: every event first takes its ticket outside of the queue, then joins the queue with the ticket in its payload.
+Three scenarios are run from one session:
+- several searches triggered at once, like "Uncheck All" changing ten selectors: all but the last are skipped;
+- a weights change and the sort change it causes, completing out of order: the update of the weights alone is
+  skipped;
+- updates left queued by a closed tab: the session is forgotten, so the queue depth goes back to 0.
+Run from the root of the repository:
+
+    python -m benchmarks.bench_event_coalescing --models 3000 --events 10
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import gradio as gr
+from fastapi.testclient import TestClient
+
+from src.about import Tasks
+
+SESSION = "bench-session"
+
+
+def write_dataset(path: str, num_models: int, seed: int = 0):
+    """Result and request files of synthetic models, in the layout of the results and requests datasets"""
+    rng = random.Random(seed)
+    for i in range(num_models):
+        org, name = f"org{i % 50}", f"model-{i}"
+        results = {task.value.benchmark: {task.value.metric: rng.random()} for task in Tasks}
+        config = {
+            "model_dtype": "torch.float16", "model_name": f"{org}/{name}", "model_sha": "main", "model_type": "pretrained"
+        }
+        os.makedirs(os.path.join(path, "results", org, name), exist_ok=True)
+        with open(os.path.join(path, "results", org, name, "results_2024-01-01T00-00-00.000000.json"), "w") as f:
+            json.dump({"config": config, "results": results}, f)
+        request = {
+            "model": f"{org}/{name}", "base_model": "", "revision": "main", "precision": "float16",
+            "weight_type": "Original", "status": "FINISHED", "submitted_time": "2024-01-01T00:00:00Z",
+            "model_type": "pretrained", "likes": i, "params": rng.choice([1.1, 7, 13, 70.5]), "license": "mit",
+            "private": False,
+        }
+        os.makedirs(os.path.join(path, "requests", org), exist_ok=True)
+        with open(os.path.join(path, "requests", org, f"{name}_eval_request_False_float16_Original.json"), "w") as f:
+            json.dump(request, f)
+
+
+def event_chain(demo: gr.Blocks, component: gr.components.Component, event: str) -> tuple:
+    """Indexes of the take_ticket function triggered by an event of the component, and of the update it chains"""
+    take = next(
+        i for i, fn in demo.fns.items() if (component._id, event) in fn.targets and fn.name == "take_ticket"
+    )
+    update = next(i for i, fn in demo.fns.items() if fn.trigger_after == take)
+    return take, update
+
+
+class Browser:
+    """Sends events of one session like the gradio frontend, and collects the outputs of the queued ones"""
+
+    def __init__(self, client: TestClient, demo: gr.Blocks):
+        self.client = client
+        self.demo = demo
+        self.pending = 0
+
+    def take_ticket(self, fn_index: int) -> int:
+        response = self.client.post("/run/predict", json={"data": [], "fn_index": fn_index, "session_hash": SESSION})
+        return response.json()["data"][0]
+
+    def join(self, fn_index: int, data: list):
+        body = {"data": data, "fn_index": fn_index, "session_hash": SESSION, "event_data": None, "trigger_id": None}
+        self.client.post("/queue/join", json=body).raise_for_status()
+        self.pending += 1
+
+    def wait(self):
+        """Waits for every joined event to complete"""
+        with self.client.stream("GET", f"/queue/data?session_hash={SESSION}") as stream:
+            for line in stream.iter_lines():
+                if '"process_completed"' in line:
+                    self.pending -= 1
+                    if self.pending == 0:
+                        return
+
+
+def outcomes(before: dict, after: dict) -> str:
+    return ", ".join(f"{k} {after[k] - before[k]}" for k in ["completed", "skipped", "discarded", "failed"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", type=int, default=3000)
+    parser.add_argument("--events", type=int, default=10)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    write_dataset(os.path.join(workdir, "source"), args.models)
+    os.environ.update(
+        HF_HOME=os.path.join(workdir, "cache"),
+        LOCAL_DATA_SOURCE=os.path.join(workdir, "source"),
+        HUB_STATUS_OFFLINE="true",
+        BOOTSTRAP_RESAMPLES="0",
+    )
+    # The app launches its server when imported, the queue is served by the test client instead
+    gr.Blocks.launch = lambda self, *args, **kwargs: None
+    import app
+
+    app.scheduler.shutdown(wait=False)
+    server = gr.routes.App.create_app(app.demo)
+    app.demo._queue.set_server_app(server)
+    with TestClient(server) as client:
+        client.get("/startup-events")
+        browser = Browser(client, app.demo)
+        search_take, search_update = event_chain(app.demo, app.search_bar, "submit")
+        search_index = [c._id for c in app.demo.fns[search_update].inputs].index(app.search_bar._id)
+
+        def search_inputs(query: str) -> list:
+            data = [c.value for c in app.demo.fns[search_update].inputs[:-1]]
+            data[search_index] = query
+            return data
+
+        # Several searches at once: every ticket is taken before the first update runs
+        before = app.table_events.stats()
+        start = time.perf_counter()
+        tickets = [browser.take_ticket(search_take) for _ in range(args.events)]
+        for i, ticket in enumerate(tickets):
+            browser.join(search_update, search_inputs(f"model-{i}") + [ticket])
+        browser.wait()
+        after = app.table_events.stats()
+        print(f"{args.events} searches at once: {outcomes(before, after)} in {time.perf_counter() - start:.2f}s")
+        assert after["skipped"] - before["skipped"] == args.events - 1
+        assert after["completed"] - before["completed"] == 1
+
+        # Choosing weights changes sort_by in the browser, which triggers a second update with the new sort. The sort
+        # update finishes first, the update of the weights alone must not overwrite its table when it runs after it.
+        weights_take, weights_update = event_chain(app.demo, app.weights_input, "change")
+        sort_take, sort_update = event_chain(app.demo, app.sort_by, "change")
+        before = app.table_events.stats()
+        weights_ticket = browser.take_ticket(weights_take)
+        sort_ticket = browser.take_ticket(sort_take)
+        browser.join(sort_update, search_inputs("") + [sort_ticket])
+        browser.wait()
+        browser.join(weights_update, search_inputs("") + [weights_ticket])
+        browser.wait()
+        after = app.table_events.stats()
+        print(f"weights then sort change, out of order: {outcomes(before, after)}")
+        assert after["skipped"] - before["skipped"] == 1
+        assert after["completed"] - before["completed"] == 1
+
+        # Updates whose tickets were taken but which never ran, then the tab is closed
+        for _ in range(3):
+            browser.take_ticket(search_take)
+        depth = app.table_events.stats()["queue_depth"]
+        unload = next(i for i, fn in app.demo.fns.items() if (None, "unload") in fn.targets)
+        browser.join(unload, [])
+        browser.wait()
+        print(f"closed tab: queue depth {depth} -> {app.table_events.stats()['queue_depth']}")
+        assert app.table_events.stats()["queue_depth"] == 0
+    print(app.table_events.stats())
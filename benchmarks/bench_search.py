@@ -0,0 +1,61 @@
+"""Search bar latency on synthetic model ids: indexed search versus a str.contains per term.
+
+The previous search ran a case-insensitive str.contains over the Model cells (HTML links) for every `;` separated
+term, then concatenated and deduplicated the matches. Run from the root of the repository:
+
+    python -m benchmarks.bench_search --models 50000
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from src.display.formatting import make_clickable_model
+from src.display.utils import AutoEvalColumn
+from src.leaderboard.search_index import SearchIndex, parse_query
+
+WORDS = ["llama", "mistral", "qwen", "gemma", "phi", "fin", "gpt", "falcon", "deepseek", "instruct", "chat", "base",
+         "v2", "7b", "13b", "70b", "awq", "gguf"]
+ORGS = ["meta-llama", "mistralai", "Qwen", "google", "TheFinAI", "microsoft"]
+QUERIES = ["llama", "mistral-instruct;qwen", "deepseek-v2-chat", "user123", "^inst", "~mistrl"]
+
+
+def synthetic_model_ids(num_models: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [
+        f"{rng.choice(ORGS + [f'user{rng.randint(0, 5000)}'])}/{'-'.join(rng.sample(WORDS, rng.randint(1, 4)))}"
+        for _ in range(num_models)
+    ]
+
+
+def contains_search(df: pd.DataFrame, query: str) -> pd.DataFrame:
+    matches = [df[df[AutoEvalColumn.model.name].str.contains(term, case=False)] for term in parse_query(query)]
+    matches = [match for match in matches if len(match) > 0]
+    return pd.concat(matches).drop_duplicates(subset=[AutoEvalColumn.model.name]) if matches else df
+
+
+def timed(function, *args, repeat: int) -> float:
+    function(*args)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(*args)
+    return (time.perf_counter() - start) / repeat
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", type=int, default=50000)
+    args = parser.parse_args()
+
+    df = pd.DataFrame({AutoEvalColumn.model.name: [make_clickable_model(m) for m in synthetic_model_ids(args.models)]})
+    start = time.perf_counter()
+    index = SearchIndex.from_df(df)
+    print(f"{args.models} models, index built in {time.perf_counter() - start:.2f}s")
+    for query in QUERIES:
+        indexed = timed(index.search, query, repeat=100)
+        contains = timed(contains_search, df, query.lstrip("^~"), repeat=3)
+        print(
+            f"{query:>24}: {indexed * 1000:7.3f}ms indexed, {contains * 1000:7.1f}ms str.contains, "
+            f"{index.search(query).sum()} matches"
+        )
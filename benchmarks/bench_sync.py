@@ -0,0 +1,64 @@
+"""Full copy versus delta sync of a synthetic results dataset, without network access.
+
+The source is a local folder standing in for the hub dataset (LocalDatasetSource). A full sync copies every file
+like snapshot_download did on each boot, the delta sync only transfers what changed since the previous one.
+Local copies are cheap, against the hub the number of files transferred is what matters.
+Run from the root of the repository:
+
+    python -m benchmarks.bench_sync --files 5000 --changed 20
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from src.sync import DeltaSync, LocalDatasetSource
+
+
+def write_dataset(path: str, num_files: int):
+    for i in range(num_files):
+        folder = os.path.join(path, f"org{i % 100}", f"model-{i}")
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, "results_2024-01-01T00-00-00.000000.json"), "w") as f:
+            json.dump({"config": {"model_name": f"org{i % 100}/model-{i}"}, "results": {"task": {"acc": i}}}, f)
+
+
+def full_copy(source_path: str, local_dir: str):
+    shutil.copytree(source_path, local_dir, dirs_exist_ok=True)
+
+
+def timed(function, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--changed", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source_path = os.path.join(tmp_dir, "source")
+        write_dataset(source_path, args.files)
+        delta_sync = DeltaSync(
+            LocalDatasetSource(source_path), os.path.join(tmp_dir, "delta"), os.path.join(tmp_dir, "state.json")
+        )
+
+        print(f"{args.files} files, {args.changed} changed between two syncs")
+        print(f"initial  full: {timed(full_copy, source_path, os.path.join(tmp_dir, 'full')):6.2f}s")
+        print(f"initial delta: {timed(delta_sync.sync):6.2f}s")
+        print(f"  noop  delta: {timed(delta_sync.sync):6.2f}s")
+
+        for i in range(args.changed):
+            file_path = os.path.join(source_path, f"org{i % 100}", f"model-{i}", "results_2024-01-01T00-00-00.000000.json")
+            with open(file_path, "a") as f:
+                f.write("\n")
+        print(f"update   full: {timed(full_copy, source_path, os.path.join(tmp_dir, 'full')):6.2f}s")
+        start = time.perf_counter()
+        report = delta_sync.sync()
+        duration = time.perf_counter() - start
+        print(f"update  delta: {duration:6.2f}s, {len(report.added) + len(report.changed)} of {args.files} files transferred")
@@ -0,0 +1,104 @@
+"""Payload and server time of one leaderboard table update, before and after the table was kept server-side.
+
+Before, every event posted the whole leaderboard back from a hidden gr.Dataframe, which the server deserialized,
+then filtered with per-event masks and str.contains. Now an event only carries the filter choices, and the table
+is filtered with the per-generation indexes. Sizes are those of the JSON gradio exchanges for the Dataframe
+components. With server-side pagination, the first paint only sends one page. Run from the root of the repository:
+
+    python -m benchmarks.bench_table_events --models 5000
+"""
+import argparse
+import json
+import time
+
+import gradio as gr
+import pandas as pd
+
+from benchmarks.bench_eval_result import build_array_results, synthetic_scores
+from src.display.utils import COLS, NUMERIC_INTERVALS, TYPES, AutoEvalColumn, ModelType, fields
+from src.leaderboard.filter_index import FilterIndex
+from src.leaderboard.search_index import SearchIndex
+from src.populate import leaderboard_frame
+
+DISPLAYED_COLS = [c.name for c in fields(AutoEvalColumn) if c.never_hidden or c.displayed_by_default]
+# Choices of one event: two model types, two sizes, a search for two models
+EVENT = {
+    "type_query": [ModelType.PT.to_str(), ModelType.FT.to_str()],
+    "precision_query": ["All"],
+    "size_query": ["~7", "~13"],
+    "show_deleted": True,
+    "query": "model-1;model-2",
+}
+
+
+def hidden_table_update(df: pd.DataFrame, type_query, precision_query, size_query, show_deleted, query):
+    """filter_models and filter_queries as they ran on the table posted back by the browser"""
+    if not show_deleted:
+        df = df[df[AutoEvalColumn.still_on_hub.name].fillna(False).to_numpy(dtype=bool)]
+    if "All" not in type_query:
+        df = df.loc[df[AutoEvalColumn.model_type_symbol.name].isin([t[0] for t in type_query])]
+    if "All" not in precision_query:
+        df = df.loc[df[AutoEvalColumn.precision.name].isin(precision_query + ["None"])]
+    if "All" not in size_query:
+        numeric_interval = pd.IntervalIndex(sorted([NUMERIC_INTERVALS[s] for s in size_query]))
+        params_column = pd.to_numeric(df[AutoEvalColumn.params.name], errors="coerce")
+        df = df.loc[params_column.apply(lambda x: any(numeric_interval.contains(x)))]
+    matches = [df[df[AutoEvalColumn.model.name].str.contains(q.strip(), case=False)] for q in query.split(";")]
+    matches = [match for match in matches if len(match) > 0]
+    if matches:
+        df = pd.concat(matches).drop_duplicates(
+            subset=[AutoEvalColumn.model.name, AutoEvalColumn.precision.name, AutoEvalColumn.revision.name]
+        )
+    return df[DISPLAYED_COLS]
+
+
+def indexed_update(df: pd.DataFrame, filter_index: FilterIndex, search_index: SearchIndex, **event):
+    rows = filter_index.filter(event["type_query"], event["size_query"], event["precision_query"], event["show_deleted"])
+    rows = rows[search_index.search(event["query"])[rows]]
+    return df.iloc[rows][DISPLAYED_COLS]
+
+
+def synthetic_leaderboard(num_models: int) -> pd.DataFrame:
+    eval_results = build_array_results(synthetic_scores(num_models))
+    for i, eval_result in enumerate(eval_results):
+        eval_result.model_type = list(ModelType)[i % len(ModelType)]
+        eval_result.num_params = [1, 3, 7, 13, 34, 70][i % 6]
+        eval_result.still_on_hub = i % 5 != 0
+    return leaderboard_frame(eval_results, [r.info_dict() for r in eval_results], COLS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    df = synthetic_leaderboard(args.models)
+    hidden_table = gr.Dataframe(headers=COLS, datatype=TYPES)
+    shown_table = gr.Dataframe(headers=DISPLAYED_COLS)
+
+    # Before: the hidden table is sent to the browser and posted back with the choices of the event
+    start = time.perf_counter()
+    hidden_payload = hidden_table.postprocess(df).model_dump_json()
+    posted_df = hidden_table.preprocess(hidden_table.data_model.model_validate_json(hidden_payload))
+    before_df = hidden_table_update(posted_df, **EVENT)
+    before_duration = time.perf_counter() - start
+    before_request = len(hidden_payload) + len(json.dumps(EVENT))
+    before_response = len(shown_table.postprocess(before_df).model_dump_json())
+
+    # After: only the choices are posted, the indexes are built once per data generation
+    filter_index, search_index = FilterIndex(df), SearchIndex.from_df(df)
+    start = time.perf_counter()
+    after_df = indexed_update(df, filter_index, search_index, **EVENT)
+    after_duration = time.perf_counter() - start
+    after_request = len(json.dumps(EVENT))
+    after_response = len(shown_table.postprocess(after_df).model_dump_json())
+
+    # First paint: the unfiltered table, whole or its first page
+    first_paint = len(shown_table.postprocess(df[DISPLAYED_COLS]).model_dump_json())
+    first_page = len(shown_table.postprocess(df[DISPLAYED_COLS].head(args.page_size)).model_dump_json())
+
+    print(f"{args.models} models, {len(after_df)} rows shown after the event")
+    print(f"before: request {before_request / 1e3:9.1f}kB, response {before_response / 1e3:7.1f}kB, server {before_duration * 1000:7.1f}ms")
+    print(f" after: request {after_request / 1e3:9.1f}kB, response {after_response / 1e3:7.1f}kB, server {after_duration * 1000:7.1f}ms")
+    print(f"first paint: whole table {first_paint / 1e3:.1f}kB, first page of {args.page_size} rows {first_page / 1e3:.1f}kB")
@@ -0,0 +1,57 @@
+"""Sequential versus concurrent validation of a submission, against a fake hub client without network access.
+
+Each hub call of the fake sleeps for a fixed latency. The same submission is validated with the checks run one after
+the other, like add_new_eval used to, and concurrently, then with a failing model card and with a hanging hub. The
+interpreter waits for the abandoned hanging call before exiting.
+Run from the root of the repository:
+
+    python -m benchmarks.bench_validation --latency 0.5 --timeout 2
+"""
+import argparse
+import time
+from types import SimpleNamespace
+
+from src.submission.validation import HubClient, validate_submission
+
+
+class FakeHubClient(HubClient):
+    def __init__(self, latency: float, card_error: str = None, hang: float = 0.0):
+        self.latency = latency
+        self.card_error = card_error
+        self.hang = hang
+
+    def model_on_hub(self, model: str, revision: str) -> tuple[bool, str]:
+        # Loading the config and the tokenizer takes two round-trips
+        time.sleep(2 * self.latency + self.hang)
+        return True, None
+
+    def model_info(self, model: str, revision: str):
+        time.sleep(self.latency)
+        return SimpleNamespace(
+            modelId=model, likes=3, safetensors={"total": 7e9}, cardData={"license": "apache-2.0"}
+        )
+
+    def model_card(self, model: str) -> tuple[bool, str]:
+        time.sleep(self.latency)
+        return (False, self.card_error) if self.card_error else (True, "")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per simulated hub round-trip")
+    parser.add_argument("--timeout", type=float, default=2.0, help="seconds allowed per check")
+    args = parser.parse_args()
+
+    cases = [
+        ("sequential", FakeHubClient(args.latency), "Delta", 1),
+        ("concurrent", FakeHubClient(args.latency), "Delta", None),
+        ("card refused, sequential", FakeHubClient(args.latency, card_error="Model card too short"), "Original", 1),
+        ("card refused, concurrent", FakeHubClient(args.latency, card_error="Model card too short"), "Original", None),
+        ("hub hanging, concurrent", FakeHubClient(args.latency, hang=10 * args.timeout), "Original", None),
+    ]
+    for name, client, weight_type, num_workers in cases:
+        validation = validate_submission(
+            "org/model", "org/base", "main", "float16", weight_type, client, timeout=args.timeout, num_workers=num_workers
+        )
+        print(f"{name:26s}", end=" ")
+        validation.report("org/model")
@@ -22,4 +22,28 @@ EVAL_RESULTS_PATH = os.path.join(CACHE_PATH, "eval-results")
 EVAL_REQUESTS_PATH_BACKEND = os.path.join(CACHE_PATH, "eval-queue-bk")
 EVAL_RESULTS_PATH_BACKEND = os.path.join(CACHE_PATH, "eval-results-bk")
 
+# Leaderboard build
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", 8)) # 1 parses result files sequentially
+INGEST_EXECUTOR = os.environ.get("INGEST_EXECUTOR", "thread") # "thread" or "process"
+INGEST_MANIFEST_PATH = os.path.join(CACHE_PATH, "eval-results-manifest.pkl") # what previous builds ingested
+RESULT_STREAMING_THRESHOLD = int(os.environ.get("RESULT_STREAMING_THRESHOLD", 1024 * 1024)) # bytes, needs ijson
+RESULT_PARSE_PROFILE = os.environ.get("RESULT_PARSE_PROFILE", "false").lower() == "true" # print time/memory per file
+SNAPSHOT_PATH = os.path.join(CACHE_PATH, "leaderboard-snapshot") # built tables, see src/leaderboard/snapshot.py
+REFRESH_INTERVAL = int(os.environ.get("REFRESH_INTERVAL", 1800)) # seconds between two reloads of the data by the app
+BLOCKING_STARTUP = os.environ.get("BLOCKING_STARTUP", "false").lower() == "true" # wait for the first sync instead of serving the last snapshot
+LOCAL_DATA_SOURCE = os.environ.get("LOCAL_DATA_SOURCE") # folder with requests/ and results/ synced instead of the hub datasets
+REQUEST_STATE_PATH = os.path.join(CACHE_PATH, "eval-queue-state.pkl") # request files read by previous runs, see src/submission/request_index.py
+SUBMISSION_INDEX_PATH = os.path.join(CACHE_PATH, "submissions.sqlite") # submitted models, see src/submission/submission_index.py
+SUBMISSION_CHECK_TIMEOUT = float(os.environ.get("SUBMISSION_CHECK_TIMEOUT", 60)) # seconds per hub check of a submission, see src/submission/validation.py
+SYNC_STATE_PATH = os.path.join(CACHE_PATH, "sync-state") # revision and file hashes of the last sync of each dataset
+TABLE_CACHE_SIZE = int(os.environ.get("TABLE_CACHE_SIZE", 128)) # filter results kept in memory, 0 disables the cache
+LEADERBOARD_PAGE_SIZE = int(os.environ.get("LEADERBOARD_PAGE_SIZE", 100)) # rows sent per page of the leaderboard, 0 sends them all
+BOOTSTRAP_RESAMPLES = int(os.environ.get("BOOTSTRAP_RESAMPLES", 1000)) # task resamples for the confidence intervals, 0 turns them off
+
+# Hub availability of the evaluated models
+HUB_STATUS_CACHE_PATH = os.path.join(CACHE_PATH, "hub-status-cache.json")
+HUB_STATUS_CACHE_TTL = int(os.environ.get("HUB_STATUS_CACHE_TTL", 24 * 3600)) # seconds before an entry is revalidated
+HUB_STATUS_REVALIDATION_BATCH = int(os.environ.get("HUB_STATUS_REVALIDATION_BATCH", 50)) # entries refreshed per background run
+HUB_STATUS_OFFLINE = os.environ.get("HUB_STATUS_OFFLINE", "false").lower() == "true" # build only from the cache
+
 API = HfApi(token=TOKEN)
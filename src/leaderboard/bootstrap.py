@@ -0,0 +1,85 @@
+import numpy as np
+
+from src.display.utils import AutoEvalColumn
+from src.leaderboard.scores import CATEGORY_AVERAGE_COLS, nan_average, normalize_scores
+
+BOOTSTRAP_SEED = 0 # the intervals of a data generation do not change between restarts
+CONFIDENCE = 0.95
+RESAMPLE_BATCH = 250 # resamples ranked at once, bounds the memory of the argsort
+
+AVERAGE_RANK_INTERVAL_COL = "Average rank 95% CI"
+HOLDS_RANK_COL = "Holds Average rank (%)"
+
+
+def interval_col(column: str) -> str:
+    """Name of the confidence interval column shown next to an average column"""
+    return f"{column.replace(' ⬆️', '')} 95% CI"
+
+
+def resampled_averages(scores: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Models x resamples averages of the scores over resampled tasks, given as tasks x resamples draw counts.
+    Missing scores are left out like in nan_average, rows without any drawn score average 0."""
+    present = ~np.isnan(scores)
+    total = np.where(present, scores, 0.0).astype(np.float32) @ counts
+    drawn = present.astype(np.float32) @ counts
+    return np.divide(total, drawn, out=np.zeros_like(total), where=drawn > 0)
+
+
+def percentile_interval(samples: np.ndarray) -> tuple:
+    """Central CONFIDENCE interval of each row of samples, interpolated like np.percentile, which partitions the
+    rows more slowly than a full sort"""
+    ordered = np.sort(samples, axis=1)
+    tail = (1 - CONFIDENCE) / 2
+    bounds = []
+    for quantile in [tail, 1 - tail]:
+        position = quantile * (ordered.shape[1] - 1)
+        below = int(np.floor(position))
+        above = min(below + 1, ordered.shape[1] - 1)
+        fraction = position - below
+        bounds.append(ordered[:, below] * (1 - fraction) + ordered[:, above] * fraction)
+    return tuple(bounds)
+
+
+class Bootstrap:
+    """Bootstrap confidence intervals of the Average and category average columns, resampling the tasks with
+    replacement, built once per data generation.
+
+    A resample is a count of draws per task, so all the resamples of all the models are averaged with two matrix
+    products, like the weighted averages. The rank of each model by Average is also computed in every resample,
+    giving an interval of its rank and the share of resamples where it keeps the rank it has on the board. Ties keep
+    the table order, as on the board.
+    """
+
+    def __init__(self, scores: np.ndarray, num_resamples: int = 1000, seed: int = BOOTSTRAP_SEED):
+        rng = np.random.default_rng(seed)
+        num_rows, num_tasks = scores.shape
+        self.intervals = {}
+
+        counts = self._draw_counts(rng, num_tasks, num_resamples)
+        averages = resampled_averages(scores, counts)
+        self.intervals[AutoEvalColumn.average.name] = percentile_interval(averages)
+
+        # Rank 0 is the best. The board rank follows the unresampled Average, in table order for ties.
+        board_ranks = self._ranks(nan_average(scores)[:, None])[:, 0]
+        ranks = np.empty((num_rows, num_resamples), dtype=np.int32)
+        for start in range(0, num_resamples, RESAMPLE_BATCH):
+            ranks[:, start:start + RESAMPLE_BATCH] = self._ranks(averages[:, start:start + RESAMPLE_BATCH])
+        self.rank_intervals = percentile_interval(ranks)
+        self.holds_rank = (ranks == board_ranks[:, None]).mean(axis=1)
+
+        normalized = normalize_scores(scores)
+        for column, task_indices in CATEGORY_AVERAGE_COLS.items():
+            if len(task_indices) == 0:
+                continue
+            counts = self._draw_counts(rng, len(task_indices), num_resamples)
+            self.intervals[column] = percentile_interval(resampled_averages(normalized[:, task_indices], counts))
+
+    def _draw_counts(self, rng: np.random.Generator, num_tasks: int, num_resamples: int) -> np.ndarray:
+        """Tasks x resamples number of times each task is drawn, num_tasks draws per resample"""
+        return rng.multinomial(num_tasks, np.full(num_tasks, 1 / num_tasks), size=num_resamples).T.astype(np.float32)
+
+    def _ranks(self, averages: np.ndarray) -> np.ndarray:
+        order = np.argsort(-averages, axis=0, kind="stable")
+        ranks = np.empty(averages.shape, dtype=np.int32)
+        np.put_along_axis(ranks, order, np.arange(len(averages), dtype=np.int32)[:, None], axis=0)
+        return ranks
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+from src.display.utils import AutoEvalColumn
+from src.leaderboard.scores import CATEGORY_AVERAGE_COLS, TASKS
+from src.leaderboard.search_index import plain_model_id
+
+# Metrics where the lower score wins a head-to-head comparison
+LOWER_IS_BETTER_METRICS = {"RMSE"}
+# Largest selection compared pairwise, a search matching more models keeps the best ones by Average
+MAX_COMPARED_MODELS = 200
+
+
+def model_labels(df: pd.DataFrame) -> list:
+    """Plain model ids of the rows, with the precision added to the ids evaluated in several precisions"""
+    model_ids = pd.Series([plain_model_id(cell) for cell in df[AutoEvalColumn.model.name]], index=df.index)
+    duplicated = model_ids.duplicated(keep=False)
+    precisions = df[AutoEvalColumn.precision.name].astype(str)
+    return [f"{m} ({p})" if d else m for m, p, d in zip(model_ids, precisions, duplicated)]
+
+
+class Comparison:
+    """Head-to-head comparisons of the leaderboard models on the raw task scores, built once per data generation.
+
+    A model beats another on a task when both have a score and its score is better (lower for RMSE, higher
+    otherwise). Its win rate against the other counts ties as half wins, over the tasks both have. The win rate of
+    every model against the whole board is computed with the generation from the sorted scores of each task, pairwise
+    matrices are computed for a selection of rows with one broadcast comparison per task.
+    """
+
+    def __init__(self, scores: np.ndarray):
+        lower_is_better = np.array([task.metric in LOWER_IS_BETTER_METRICS for task in TASKS])
+        # Oriented so that higher always wins
+        self.scores = np.where(lower_is_better, -scores, scores)
+
+        num_rows = len(scores)
+        self.board_wins = np.zeros(num_rows, dtype=np.int64)
+        self.board_ties = np.zeros(num_rows, dtype=np.int64)
+        self.board_comparisons = np.zeros(num_rows, dtype=np.int64)
+        for column in self.scores.T:
+            present = np.flatnonzero(~np.isnan(column))
+            values = np.sort(column[present])
+            below = np.searchsorted(values, column[present], side="left")
+            equal = np.searchsorted(values, column[present], side="right") - below - 1
+            self.board_wins[present] += below
+            self.board_ties[present] += equal
+            self.board_comparisons[present] += len(present) - 1
+
+    def board_win_rates(self) -> np.ndarray:
+        """Win rate of each row against all the other models, NaN for rows without any comparison"""
+        return np.divide(
+            self.board_wins + self.board_ties / 2,
+            self.board_comparisons,
+            out=np.full(len(self.board_wins), np.nan),
+            where=self.board_comparisons > 0,
+        )
+
+    def head_to_head(self, rows: np.ndarray) -> dict:
+        """Wins, ties and shared tasks of each pair of the given rows, as matrices in the order of the rows, and the
+        win rate matrix, NaN on the diagonal and for pairs without a shared task"""
+        scores = self.scores[rows]
+        wins = np.zeros((len(rows), len(rows)), dtype=np.int32)
+        ties = np.zeros_like(wins)
+        shared = np.zeros_like(wins)
+        for column in scores.T:
+            present = ~np.isnan(column)
+            # Comparisons with NaN are False, so missing scores count neither as wins nor as ties
+            wins += column[:, None] > column[None, :]
+            ties += column[:, None] == column[None, :]
+            shared += present[:, None] & present[None, :]
+        win_rates = np.divide(wins + ties / 2, shared, out=np.full(wins.shape, np.nan), where=shared > 0)
+        np.fill_diagonal(win_rates, np.nan)
+        return {"wins": wins, "ties": ties, "shared": shared, "win_rates": win_rates}
+
+
+def category_deltas(df: pd.DataFrame, rows: np.ndarray) -> pd.DataFrame:
+    """Category averages of the given rows minus those of the first one"""
+    averages = df.iloc[rows][list(CATEGORY_AVERAGE_COLS)].to_numpy(dtype=float)
+    return pd.DataFrame((averages - averages[0]).round(decimals=2), columns=list(CATEGORY_AVERAGE_COLS))
@@ -0,0 +1,80 @@
+import itertools
+import threading
+
+
+class EventCoalescer:
+    """Keeps only the latest table update of each browser session.
+
+    Every event takes a ticket when it is triggered, before waiting in the gradio queue, and carries it by value in
+    its payload. When its turn comes, an update whose session took a newer ticket meanwhile is skipped, and one
+    superseded while it was running has its result dropped, so concurrency slots go to the state the user is looking
+    at. "Uncheck All", which changes ten column selectors at once, then costs a single table update instead of ten.
+
+    Updates still queued count in the queue depth until they finish. Once the latest update of a session finished,
+    its older ones can only be skipped, or were cancelled by gradio and will never finish, so they are forgotten.
+    The latest ticket of a session is kept until the session is closed, so that an older update running after it
+    finished is still skipped.
+    """
+
+    def __init__(self):
+        self._tickets = itertools.count(1)
+        # Per open session: latest ticket and the tickets registered but not finished yet
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self.registered = 0
+        self.completed = 0
+        self.skipped = 0
+        self.discarded = 0
+        self.failed = 0
+        self.max_queue_depth = 0
+
+    def register(self, session: str) -> int:
+        with self._lock:
+            ticket = next(self._tickets)
+            _, pending = self._sessions.get(session, (0, set()))
+            pending.add(ticket)
+            self._sessions[session] = (ticket, pending)
+            self.registered += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._queue_depth())
+            return ticket
+
+    def is_latest(self, session: str, ticket: int) -> bool:
+        with self._lock:
+            latest, _ = self._sessions.get(session, (ticket, None))
+            return ticket >= latest
+
+    def finish(self, session: str, ticket: int, outcome: str):
+        """Records how an update ended: "completed", "skipped" before it ran, "discarded" when a newer one was
+        registered while it ran, or "failed" when it raised"""
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            if session not in self._sessions:
+                return
+            latest, pending = self._sessions[session]
+            pending.discard(ticket)
+            if ticket >= latest:
+                pending.clear()
+
+    def close(self, session: str):
+        """Forgets a session whose browser tab was closed, with the updates it still had queued"""
+        with self._lock:
+            self._sessions.pop(session, None)
+
+    def _queue_depth(self) -> int:
+        """Updates registered and not finished yet, over all sessions"""
+        return sum(len(pending) for _, pending in self._sessions.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": self._queue_depth(),
+                "max_queue_depth": self.max_queue_depth,
+                "sessions": len(self._sessions),
+                "busy_sessions": sum(1 for _, pending in self._sessions.values() if pending),
+                "registered": self.registered,
+                "completed": self.completed,
+                "dropped": self.skipped + self.discarded,
+                "skipped": self.skipped,
+                "discarded": self.discarded,
+                "failed": self.failed,
+            }
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+from src.display.utils import NUMERIC_INTERVALS, AutoEvalColumn
+
+
+def size_buckets(params: np.ndarray) -> np.ndarray:
+    """Position in NUMERIC_INTERVALS of the interval holding each value, -1 when none does.
+    Intervals are right-closed and sorted by their right bound, so a binary search on those bounds finds the only
+    candidate, which is then checked against its left bound."""
+    intervals = list(NUMERIC_INTERVALS.values())
+    order = np.argsort([interval.right for interval in intervals], kind="stable")
+    rights = np.array([intervals[i].right for i in order], dtype=float)
+    lefts = np.array([intervals[i].left for i in order], dtype=float)
+
+    candidates = np.searchsorted(rights, params, side="left")
+    in_range = candidates < len(rights)
+    candidates = np.minimum(candidates, len(rights) - 1)
+    in_range &= params > lefts[candidates]  # NaN compares False
+    return np.where(in_range, order[candidates], -1)
+
+
+class FilterIndex:
+    """Bitmaps of the leaderboard rows matching each value of the model type, precision, size and hub filters,
+    built once per data generation. A filter combination is answered by ORing the bitmaps of the selected values of
+    each filter, then ANDing the filters together.
+
+    The answers are the ones app.filter_models gave when it rebuilt masks on every event, including its handling of
+    "?": the type filter keeps every row for a raw "?" choice, and the precision and size filters keep the rows where
+    the column is missing.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.num_rows = len(df)
+        self.all_rows = self._pack(np.ones(self.num_rows, dtype=bool))
+        self.no_rows = self._pack(np.zeros(self.num_rows, dtype=bool))
+
+        self.on_hub = self._pack(df[AutoEvalColumn.still_on_hub.name].fillna(False).to_numpy(dtype=bool))
+        self.type_symbols = self._value_bitmaps(df[AutoEvalColumn.model_type_symbol.name])
+        self.precisions = self._value_bitmaps(df[AutoEvalColumn.precision.name])
+        self.precision_missing = self._pack(df[AutoEvalColumn.precision.name].isna().to_numpy())
+
+        params = df[AutoEvalColumn.params.name]
+        self.params_missing = self._pack(params.isna().to_numpy())
+        buckets = size_buckets(pd.to_numeric(params, errors="coerce").to_numpy(dtype=float))
+        self.sizes = {
+            size: self._pack(buckets == position) for position, size in enumerate(NUMERIC_INTERVALS)
+        }
+
+    def _pack(self, mask: np.ndarray) -> np.ndarray:
+        return np.packbits(mask.astype(bool))
+
+    def _value_bitmaps(self, column: pd.Series) -> dict:
+        codes, values = pd.factorize(column, use_na_sentinel=True)
+        return {value: self._pack(codes == code) for code, value in enumerate(values)}
+
+    def _any(self, bitmaps: list) -> np.ndarray:
+        return np.bitwise_or.reduce(bitmaps) if bitmaps else self.no_rows
+
+    def filter(self, type_query: list, size_query: list, precision_query: list, show_deleted: bool) -> np.ndarray:
+        """Positions of the rows kept by the filters, in table order"""
+        selected = self.all_rows if show_deleted else self.on_hub
+
+        if "All" not in type_query and "?" not in type_query:
+            selected = selected & self._any([self.type_symbols[t[0]] for t in type_query if t[0] in self.type_symbols])
+
+        if "All" not in precision_query:
+            if "?" in precision_query:
+                selected = selected & self.precision_missing
+            else:
+                values = precision_query + ["None"]
+                selected = selected & self._any([self.precisions[p] for p in values if p in self.precisions])
+
+        if "All" not in size_query:
+            if "?" in size_query:
+                selected = selected & self.params_missing
+            else:
+                selected = selected & self._any([self.sizes[s] for s in size_query if s in self.sizes])
+
+        return np.flatnonzero(np.unpackbits(selected, count=self.num_rows))
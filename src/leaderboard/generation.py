@@ -0,0 +1,151 @@
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field
+from typing import Callable
+
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class DataGeneration:
+    """One immutable version of the tables served by the app. A new generation is built on every refresh,
+    handlers keep using the generation they started with until they return."""
+    id: int
+    created_at: float
+    as_of: float # when the data was last synced, None if it never was
+    leaderboard_df: pd.DataFrame
+    finished_eval_queue_df: pd.DataFrame
+    running_eval_queue_df: pd.DataFrame
+    pending_eval_queue_df: pd.DataFrame
+    scores_df: pd.DataFrame = None # raw task scores of the leaderboard rows, see src.leaderboard.snapshot.build_frames
+    derived: dict = field(default_factory=dict, compare=False) # indexes built from the tables, see GenerationStore.add_derived
+
+    @classmethod
+    def from_frames(cls, generation_id: int, frames: dict, as_of: float = None) -> "DataGeneration":
+        return cls(
+            id=generation_id,
+            created_at=time.time(),
+            as_of=as_of,
+            leaderboard_df=frames["leaderboard"],
+            finished_eval_queue_df=frames["finished"],
+            running_eval_queue_df=frames["running"],
+            pending_eval_queue_df=frames["pending"],
+            scores_df=frames.get("scores"),
+        )
+
+
+class GenerationStore:
+    """Holds the current data generation and refreshes it in the background.
+
+    `build` returns the tables as a dict (see src.leaderboard.snapshot.build_frames), `sync` fetches the latest
+    result and request files before a build. When `sync` returns the list of paths it changed and that list is
+    empty, the current generation is kept as is. A refresh that fails leaves the current generation in place,
+    except when no data was served yet: the tables are then built from the local files, however old they are.
+    """
+
+    def __init__(self, build: Callable[[], dict], sync: Callable[[], list] = None, refresh_interval: int = 0):
+        self.build = build
+        self.sync = sync
+        self.refresh_interval = refresh_interval
+        self.last_success_at = None
+        self.last_attempt_at = None
+        self.last_error = None
+        self.synced_at = None
+        self._generation = None
+        self._built_from_sync = False
+        self._next_id = 1
+        self._publish_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._derived_builders = {}
+
+    def current(self) -> DataGeneration:
+        return self._generation
+
+    def add_derived(self, name: str, build: Callable[[DataGeneration], object]):
+        """Registers a value computed from every new generation before it is served, as generation.derived[name]"""
+        self._derived_builders[name] = build
+        if self._generation is not None:
+            self._generation.derived[name] = build(self._generation)
+
+    def is_refreshing(self) -> bool:
+        return self._refresh_lock.locked()
+
+    def publish(self, frames: dict, as_of: float = None) -> DataGeneration:
+        generation = self._publish(frames, as_of)
+        self.synced_at = as_of
+        self.last_success_at = generation.created_at
+        self.last_error = None
+        return generation
+
+    def publish_empty(self, frames: dict) -> DataGeneration:
+        """Serves tables without rows when no data could be loaded, so that the app can start. This is not a
+        successful refresh: the next refreshes still build from the local files if the sync fails."""
+        return self._publish(frames, None)
+
+    def _publish(self, frames: dict, as_of: float) -> DataGeneration:
+        with self._publish_lock:
+            generation = DataGeneration.from_frames(self._next_id, frames, as_of)
+            for name, build in self._derived_builders.items():
+                generation.derived[name] = build(generation)
+            self._next_id += 1
+            # A single reference assignment: readers see either the old or the new generation, never a mix
+            self._generation = generation
+            self._built_from_sync = False
+        return generation
+
+    def refresh(self) -> bool:
+        """Syncs and rebuilds the tables, then publishes them. Returns False if the refresh failed or if
+        another one was already running."""
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            self.last_attempt_at = time.time()
+            sync_error = None
+            changed_paths = None
+            try:
+                if self.sync is not None:
+                    changed_paths = self.sync()
+            except Exception as e:
+                if self.last_success_at is not None:
+                    raise
+                print("Sync failed and there is no data to serve yet, building from the local files")
+                traceback.print_exc()
+                sync_error = f"{type(e).__name__}: {e}"
+
+            if changed_paths is not None and len(changed_paths) == 0 and self._built_from_sync:
+                print(f"No data changes, still serving generation {self._generation.id}")
+                self.synced_at = self.last_attempt_at
+                self.last_success_at = self.last_attempt_at
+                self.last_error = None
+                return True
+
+            self.publish(self.build(), None if sync_error else self.last_attempt_at)
+            self._built_from_sync = sync_error is None
+            self.last_error = sync_error
+            print(f"Published data generation {self._generation.id}")
+            return sync_error is None
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"Data refresh failed, still serving generation {self._generation.id if self._generation else None}")
+            traceback.print_exc()
+            return False
+        finally:
+            self._refresh_lock.release()
+
+    def refresh_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.refresh, name="data-refresh", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> dict:
+        generation = self._generation
+        return {
+            "generation": generation.id if generation else None,
+            "as_of": self.synced_at,
+            "refreshing": self.is_refreshing(),
+            "refresh_interval": self.refresh_interval,
+            "last_success_at": self.last_success_at,
+            "last_attempt_at": self.last_attempt_at,
+            "last_error": self.last_error,
+        }
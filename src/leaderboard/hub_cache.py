@@ -0,0 +1,210 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Callable
+
+from huggingface_hub.utils import GatedRepoError, RepositoryNotFoundError, RevisionNotFoundError
+
+from src.envs import (
+    API,
+    HUB_STATUS_CACHE_PATH,
+    HUB_STATUS_CACHE_TTL,
+    HUB_STATUS_OFFLINE,
+    HUB_STATUS_REVALIDATION_BATCH,
+    INGEST_WORKERS,
+)
+
+
+@dataclass
+class HubStatus:
+    """Availability of a model revision on the hub, as shown in the leaderboard"""
+    still_on_hub: bool
+    architecture: str = "?"
+    checked_at: float = 0.0
+
+
+# A fetcher takes (model, revision) and returns (still_on_hub, architecture). It raises on errors that say nothing
+# about the model, such as timeouts or rate limits, so that they are not cached.
+HubStatusFetcher = Callable[[str, str], tuple[bool, str]]
+
+
+def fetch_hub_status(full_model: str, revision: str) -> tuple[bool, str]:
+    """Default fetcher: reads the model info from the hub API. Only a missing repository or revision means the
+    model is not on the hub, a gated model still is."""
+    try:
+        model_info = API.model_info(repo_id=full_model, revision=revision)
+    except GatedRepoError:
+        return True, "?"
+    except (RepositoryNotFoundError, RevisionNotFoundError):
+        return False, "?"
+    architectures = (getattr(model_info, "config", None) or {}).get("architectures")
+    return True, ";".join(architectures) if architectures else "?"
+
+
+class HubStatusCache:
+    """On-disk cache of hub availability keyed by (model, revision).
+
+    Missing entries are fetched while building the leaderboard. Entries older than the ttl are still served,
+    and refreshed later by `revalidate_stale` in a background thread, a bounded number at a time.
+    A fetch that fails is not cached: an unknown model is then assumed to be on the hub until a fetch succeeds, and
+    a stale entry is kept as is and retried with the next batch.
+    In offline mode the fetcher is never called and unknown models are reported as not on the hub.
+    """
+
+    def __init__(
+        self,
+        path: str = HUB_STATUS_CACHE_PATH,
+        ttl: float = HUB_STATUS_CACHE_TTL,
+        fetcher: HubStatusFetcher = fetch_hub_status,
+        offline: bool = HUB_STATUS_OFFLINE,
+        revalidation_batch: int = HUB_STATUS_REVALIDATION_BATCH,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.fetcher = fetcher
+        self.offline = offline
+        self.revalidation_batch = revalidation_batch
+        self.entries = {}
+        self.stale = set()
+        self.dirty = False
+        self._lock = threading.Lock()
+        # Builds and the revalidation thread both save, one at a time through the same temporary file
+        self._save_lock = threading.Lock()
+        self._revalidation_thread = None
+        self.load()
+
+    @staticmethod
+    def key(full_model: str, revision: str) -> str:
+        return f"{full_model}@{revision}"
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                self.entries = {k: HubStatus(**v) for k, v in json.load(f).items()}
+        except (ValueError, TypeError):
+            print(f"Ignoring unreadable hub status cache {self.path}")
+            self.entries = {}
+
+    def save(self):
+        if not self.dirty:
+            return
+        with self._save_lock:
+            with self._lock:
+                self.dirty = False
+                data = {k: asdict(v) for k, v in self.entries.items()}
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+
+    def _fetch(self, full_model: str, revision: str) -> HubStatus:
+        still_on_hub, architecture = self.fetcher(full_model, revision)
+        status = HubStatus(still_on_hub=still_on_hub, architecture=architecture, checked_at=time.time())
+        with self._lock:
+            self.entries[self.key(full_model, revision)] = status
+            self.dirty = True
+            self.stale.discard((full_model, revision))
+        return status
+
+    def get(self, full_model: str, revision: str) -> HubStatus:
+        """Returns the cached status, fetching it only if it was never seen before"""
+        with self._lock:
+            status = self.entries.get(self.key(full_model, revision))
+            if status is not None and time.time() - status.checked_at > self.ttl:
+                self.stale.add((full_model, revision))
+        if status is not None:
+            return status
+        if self.offline:
+            return HubStatus(still_on_hub=False)
+        try:
+            return self._fetch(full_model, revision)
+        except Exception as e:
+            print(f"Could not fetch hub status of {full_model}@{revision}: {e}")
+            # Retried by the next revalidation
+            with self._lock:
+                self.stale.add((full_model, revision))
+            return HubStatus(still_on_hub=True)
+
+    def get_many(self, models: list[tuple[str, str]], num_workers: int = INGEST_WORKERS) -> list[HubStatus]:
+        """Looks up several (model, revision) pairs, fetching the cache misses concurrently"""
+        statuses = [
+            self.get(full_model, revision) if self.offline or self.key(full_model, revision) in self.entries else None
+            for full_model, revision in models
+        ]
+        misses = [i for i, status in enumerate(statuses) if status is None]
+        if num_workers <= 1 or len(misses) <= 1:
+            fetched = [self.get(*models[i]) for i in misses]
+        else:
+            with ThreadPoolExecutor(max_workers=num_workers) as pool:
+                fetched = list(pool.map(lambda i: self.get(*models[i]), misses))
+        for i, status in zip(misses, fetched):
+            statuses[i] = status
+        self.save()
+        return statuses
+
+    def revalidate_stale(self, limit: int = None) -> int:
+        """Refreshes up to `limit` stale entries, and returns how many were refreshed"""
+        limit = self.revalidation_batch if limit is None else limit
+        with self._lock:
+            batch = list(self.stale)[:limit]
+        for full_model, revision in batch:
+            try:
+                self._fetch(full_model, revision)
+            except Exception as e:
+                print(f"Could not revalidate hub status of {full_model}@{revision}: {e}")
+        self.save()
+        return len(batch)
+
+    def fingerprint(self, keys: list[str]) -> str:
+        """Hash of the current statuses of the given keys, as a build looking them up now would show them. Keys
+        never fetched successfully are hashed with the status `get` assumes for them."""
+        default = (not self.offline, "?")
+        with self._lock:
+            statuses = {
+                key: (status.still_on_hub, status.architecture) if status is not None else default
+                for key, status in ((key, self.entries.get(key)) for key in keys)
+            }
+        return status_fingerprint(statuses)
+
+    def start_revalidation(self):
+        """Revalidates one batch of stale entries in a background thread, unless one is already running.
+        Entries are found stale by age here too, since the data refreshes without changes do not look them up."""
+        if self.offline:
+            return
+        now = time.time()
+        with self._lock:
+            self.stale.update(
+                tuple(key.rsplit("@", 1)) for key, status in self.entries.items() if now - status.checked_at > self.ttl
+            )
+        if not self.stale:
+            return
+        if self._revalidation_thread is not None and self._revalidation_thread.is_alive():
+            return
+        self._revalidation_thread = threading.Thread(target=self.revalidate_stale, daemon=True)
+        self._revalidation_thread.start()
+
+
+def status_fingerprint(statuses: dict[str, tuple]) -> str:
+    """Hash of (still_on_hub, architecture) statuses by cache key"""
+    return hashlib.sha256(json.dumps(sorted((key, *status) for key, status in statuses.items())).encode()).hexdigest()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_hub_status_cache(path: str = HUB_STATUS_CACHE_PATH) -> HubStatusCache:
+    """Shared cache of a cache file. Every build and the revalidation thread use the same instance, so that their
+    entries are never saved over each other."""
+    key = os.path.abspath(path)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = HubStatusCache(path)
+        return _caches[key]
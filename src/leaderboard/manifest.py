@@ -0,0 +1,104 @@
+import hashlib
+import os
+import pickle
+from dataclasses import dataclass
+
+MANIFEST_VERSION = 3
+
+
+@dataclass
+class FileRecord:
+    """A result file as it was when last ingested, with the partial EvalResult parsed from it"""
+    size: int
+    mtime_ns: int
+    sha256: str
+    eval_result: object # EvalResult of this file alone, before merging and request/hub info
+
+
+@dataclass
+class EvalRecord:
+    """A merged EvalResult, with the inputs it was derived from and its leaderboard row"""
+    eval_result: object
+    request: dict # content of the request file used, None if there was none
+    hub_status: tuple # (still_on_hub, architecture)
+    row: dict # EvalResult.info_dict(), None if the eval is incomplete
+
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class IngestManifest:
+    """Every result file ingested by the leaderboard, used to rebuild it incrementally.
+
+    Without a path the manifest only lives in memory and every build starts from scratch.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.files = {} # result file path -> FileRecord
+        self.evals = {} # eval_name -> EvalRecord
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: str) -> "IngestManifest":
+        manifest = cls(path)
+        if not os.path.exists(path):
+            return manifest
+        try:
+            with open(path, "rb") as f:
+                version, files, evals = pickle.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable ingest manifest {path}: {e}")
+            return manifest
+        if version != MANIFEST_VERSION:
+            print(f"Ignoring ingest manifest {path} with version {version}, expected {MANIFEST_VERSION}")
+            return manifest
+        manifest.files, manifest.evals = files, evals
+        return manifest
+
+    def save(self):
+        if self.path is None or not self.dirty:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump((MANIFEST_VERSION, self.files, self.evals), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def diff(self, file_paths: list[str]) -> tuple[dict, list[str]]:
+        """Compares the files on disk with the manifest, and returns ({added or changed path: sha256}, removed paths).
+        Files are only hashed when their size or mtime moved."""
+        changed = {}
+        for file_path in file_paths:
+            stat = os.stat(file_path)
+            record = self.files.get(file_path)
+            if record is not None and record.size == stat.st_size and record.mtime_ns == stat.st_mtime_ns:
+                continue
+            sha256 = file_sha256(file_path)
+            if record is not None and record.sha256 == sha256:
+                # Touched but identical, only remember the new stat
+                record.size, record.mtime_ns = stat.st_size, stat.st_mtime_ns
+                self.dirty = True
+                continue
+            changed[file_path] = sha256
+
+        current_paths = set(file_paths)
+        removed = [file_path for file_path in self.files if file_path not in current_paths]
+        return changed, removed
+
+    def update_file(self, file_path: str, sha256: str, eval_result):
+        stat = os.stat(file_path)
+        self.files[file_path] = FileRecord(
+            size=stat.st_size, mtime_ns=stat.st_mtime_ns, sha256=sha256, eval_result=eval_result
+        )
+        self.dirty = True
+
+    def remove_file(self, file_path: str):
+        del self.files[file_path]
+        self.dirty = True
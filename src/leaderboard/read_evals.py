@@ -1,28 +1,35 @@
-import glob
-import json
 import math
 import os
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import defaultdict
+from dataclasses import dataclass, replace
 
 import dateutil
 import numpy as np
 
 from src.display.formatting import make_clickable_model
 from src.display.utils import AutoEvalColumn, ModelType, Tasks, Precision, WeightType
-from src.submission.check_validity import is_model_on_hub
+from src.envs import INGEST_EXECUTOR, INGEST_WORKERS
+from src.leaderboard.hub_cache import HubStatusCache, get_hub_status_cache
+from src.leaderboard.manifest import EvalRecord, IngestManifest
+from src.leaderboard.result_loader import load_result_file
+from src.leaderboard.scores import score_columns, score_matrix
+from src.submission.request_index import get_request_index
+from src.timing import StageTimer
 
 task_benchmarks = {task.value.benchmark for task in Tasks}
 
-@dataclass
+@dataclass(slots=True)
 class EvalResult:
     """Represents one full evaluation. Built from a combination of the result and request file for a given run.
+    Scores are kept in a float array ordered like Tasks, NaN for missing tasks.
     """
     eval_name: str # org_model_precision (uid)
     full_model: str # org/model (path on hub)
     org: str 
     model: str
     revision: str # commit hash, "" if main
-    results: dict
+    scores: np.ndarray # raw score of each task of Tasks, in order
     precision: Precision = Precision.Unknown
     model_type: ModelType = ModelType.Unknown # Pretrained, fine tuned, ...
     weight_type: WeightType = WeightType.Original # Original or Adapter
@@ -36,8 +43,7 @@ class EvalResult:
     @classmethod
     def init_from_json_file(self, json_filepath):
         """Inits the result from the specific model result file"""
-        with open(json_filepath) as fp:
-            data = json.load(fp)
+        data = load_result_file(json_filepath, task_benchmarks)
 
         config = data.get("config")
         # Precision
@@ -60,57 +66,42 @@ class EvalResult:
             result_key = f"{org}_{model}_{precision.value.name}"
         full_model = "/".join(org_and_model)
 
-        still_on_hub, _, model_config = is_model_on_hub(
-            full_model, config.get("model_sha", "main"), trust_remote_code=True, test_tokenizer=False
-        )
-        architecture = "?"
-        if model_config is not None:
-            architectures = getattr(model_config, "architectures", None)
-            if architectures:
-                architecture = ";".join(architectures)
-
         # Extract results available in this file (some results are split in several files)
-        results = {}
-        for task in Tasks:
+        scores = np.full(len(Tasks), np.nan)
+        missing_benchmarks = []
+        for i, task in enumerate(Tasks):
             task = task.value
 
             # We average all scores of a given metric (not all metrics are present in all files)
             accs = np.array([v.get(task.metric, None) for k, v in data["results"].items() if task.benchmark == k])
             if accs.size == 0 or any([acc is None for acc in accs]):
+                missing_benchmarks.append(task.benchmark)
                 continue
 
-            mean_acc = np.mean(accs) * 100.0
-            results[task.benchmark] = mean_acc
+            scores[i] = np.mean(accs) * 100.0
 
         # Print missing benchmarks if any
-        missing_benchmarks = task_benchmarks - results.keys()
         if missing_benchmarks:
             print(f"(Missing results) Model {model} is missing {', '.join(missing_benchmarks)} from result files")
-            for benchmark in missing_benchmarks:
-                results[benchmark] = "missing"
-
-
 
         return self(
             eval_name=result_key,
             full_model=full_model,
             org=org,
             model=model,
-            results=results,
-            precision=precision,  
+            scores=scores,
+            precision=precision,
             revision= config.get("model_sha", ""),
-            still_on_hub=still_on_hub,
-            architecture=architecture,
+            architecture="?", # filled in from the hub status cache, see get_raw_eval_results
             model_type=model_type
         )
 
 
     def update_with_request_file(self, requests_path):
         """Finds the relevant request file for the current model and updates info with it"""
-        request_file = get_request_file_for_model(requests_path, self.full_model, self.precision.value.name)
+        request_entry = get_request_index(requests_path).finished_request(self.full_model, self.precision.value.name)
         try:
-            with open(request_file, "r") as f:
-                request = json.load(f)
+            request = request_entry.data
             self.model_type = ModelType.from_str(request.get("model_type", ""))
             self.weight_type = WeightType[request.get("weight_type", "Original")]
             self.license = request.get("license", "?")
@@ -120,60 +111,10 @@ class EvalResult:
         except Exception:
             print(f"Could not find request file for {self.org}/{self.model} with precision {self.precision.value.name}")
 
-    def to_dict(self):
-        """Converts the Eval Result to a dict compatible with our dataframe display"""
-
-        # Initialize category averages
-        category_averages = {
-            "average_IE": [],
-            "average_TA": [],
-            "average_QA": [],
-            "average_TG": [],
-            "average_RM": [],
-            "average_FO": [],
-            "average_DM": [],
-            "average_Spanish": []
-        }
-
-        # Calculate averages for each task
-        for task in Tasks:
-            score = self.results.get(task.value.benchmark)
-            if score is not None:
-                # Append score to the appropriate category
-                if task.value.category == "Information Extraction (IE)":
-                    category_averages["average_IE"].append(score)
-                elif task.value.category == "Textual Analysis (TA)":
-                    category_averages["average_TA"].append(score)
-                elif task.value.category == "Question Answering (QA)":
-                    category_averages["average_QA"].append(score)
-                elif task.value.category == "Text Generation (TG)":
-                    category_averages["average_TG"].append(score)
-                elif task.value.category == "Risk Management (RM)":
-                    category_averages["average_RM"].append((score + 100) / 2)
-                elif task.value.category == "Forecasting (FO)":
-                    category_averages["average_FO"].append(score)
-                elif task.value.category == "Decision-Making (DM)":
-                    category_averages["average_DM"].append(score)
-                elif task.value.category == "Spanish":
-                    category_averages["average_Spanish"].append(score)
-
-        # Calculate the mean for each category and add to data_dict
-        data_dict = {}
-        for category, scores in category_averages.items():
-            # Calculate the average if there are valid scores, otherwise set to 0
-            valid_scores = [score for score in scores if score != "missing"]
-            if valid_scores:
-                average = sum(valid_scores) / len(valid_scores)
-            else:
-                average = 0
-            data_dict[category] = average
-
-        # Overall average
-        total_scores = [v for v in self.results.values() if v != "missing"]
-        overall_average = sum(total_scores) / len(total_scores) if total_scores else 0
-
-        # Add other columns
-        data_dict.update({
+    def info_dict(self):
+        """The model information columns of the leaderboard, score columns are computed for all models at once
+        by src.leaderboard.scores"""
+        return {
             "eval_name": self.eval_name,  # not a column, just a save name,
             AutoEvalColumn.precision.name: self.precision.value.name,
             AutoEvalColumn.model_type.name: self.model_type.value.name,
@@ -182,85 +123,144 @@ class EvalResult:
             AutoEvalColumn.architecture.name: self.architecture,
             AutoEvalColumn.model.name: make_clickable_model(self.full_model),
             AutoEvalColumn.revision.name: self.revision,
-            AutoEvalColumn.average.name: overall_average,
             AutoEvalColumn.license.name: self.license,
             AutoEvalColumn.likes.name: self.likes,
             AutoEvalColumn.params.name: self.num_params,
             AutoEvalColumn.still_on_hub.name: self.still_on_hub,
-        })
-
-        # Add task results to the data dictionary
-        for task in Tasks:
-            data_dict[task.value.col_name] = self.results.get(task.value.benchmark)
+        }
 
+    def to_dict(self):
+        """Converts the Eval Result to a dict compatible with our dataframe display"""
+        data_dict = self.info_dict()
+        data_dict.update({col_name: values[0] for col_name, values in score_columns(score_matrix([self])).items()})
         return data_dict
 
 
-
-
-
 def get_request_file_for_model(requests_path, model_name, precision):
     """Selects the correct request file for a given model. Only keeps runs tagged as FINISHED"""
-    request_files = os.path.join(
-        requests_path,
-        f"{model_name}_eval_request_*.json",
-    )
-    request_files = glob.glob(request_files)
-
-    # Select correct request file (precision)
-    request_file = ""
-    request_files = sorted(request_files, reverse=True)
-    for tmp_request_file in request_files:
-        with open(tmp_request_file, "r") as f:
-            req_content = json.load(f)
-            if (
-                req_content["status"] in ["FINISHED"]
-                and req_content["precision"] == precision.split(".")[-1]
-            ):
-                request_file = tmp_request_file
-    return request_file
-
-
-def get_raw_eval_results(results_path: str, requests_path: str) -> list[EvalResult]:
-    """From the path of the results folder root, extract all needed info for results"""
+    request_entry = get_request_index(requests_path).finished_request(model_name, precision)
+    return request_entry.path if request_entry is not None else ""
+
+
+def load_eval_results(model_result_filepaths: list[str], num_workers: int, executor: str) -> list[EvalResult]:
+    """Parses the result files, concurrently if num_workers > 1. Results are returned in input order."""
+    if num_workers <= 1 or len(model_result_filepaths) <= 1:
+        return [EvalResult.init_from_json_file(path) for path in model_result_filepaths]
+
+    pool_class = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    with pool_class(max_workers=num_workers) as pool:
+        return list(pool.map(EvalResult.init_from_json_file, model_result_filepaths))
+
+
+def merge_eval_results(partial_results: list[EvalResult]) -> EvalResult:
+    """Merges the results of the files of one eval, later files taking precedence. Partial results are left untouched."""
+    merged = replace(partial_results[0], scores=partial_results[0].scores.copy())
+    for eval_result in partial_results[1:]:
+        # A later file replaces every score, including the ones it is missing
+        merged.scores[:] = eval_result.scores
+    return merged
+
+
+def get_raw_eval_results(
+    results_path: str,
+    requests_path: str,
+    num_workers: int = INGEST_WORKERS,
+    executor: str = INGEST_EXECUTOR,
+    hub_cache: HubStatusCache = None,
+    manifest: IngestManifest = None,
+) -> list[EvalResult]:
+    """From the path of the results folder root, extract all needed info for results.
+    The manifest remembers what was ingested by previous builds: only the files added or changed since then are parsed,
+    and only the evals they belong to, or whose request file or hub status changed, are derived again."""
+    hub_cache = hub_cache if hub_cache is not None else get_hub_status_cache()
+    manifest = manifest if manifest is not None else IngestManifest()
+    timer = StageTimer("get_raw_eval_results")
     model_result_filepaths = []
 
-    for root, _, files in os.walk(results_path):
-        # We should only have json files in model results
-        if len(files) == 0 or any([not f.endswith(".json") for f in files]):
-            continue
+    with timer.stage("discover"):
+        for root, _, files in os.walk(results_path):
+            # We should only have json files in model results
+            if len(files) == 0 or any([not f.endswith(".json") for f in files]):
+                continue
 
-        # Sort the files by date
-        try:
-            files.sort(key=lambda x: x.removesuffix(".json").removeprefix("results_")[:-7])
-        except dateutil.parser._parser.ParserError:
-            files = [files[-1]]
+            # Sort the files by date
+            try:
+                files.sort(key=lambda x: x.removesuffix(".json").removeprefix("results_")[:-7])
+            except dateutil.parser._parser.ParserError:
+                files = [files[-1]]
+
+            for file in files:
+                model_result_filepaths.append(os.path.join(root, file))
+
+        request_index = get_request_index(requests_path)
+
+    with timer.stage("diff"):
+        changed_filepaths, removed_filepaths = manifest.diff(model_result_filepaths)
+
+    print(f"Found {len(model_result_filepaths)} JSON files, {len(changed_filepaths)} to process.")
+
+    with timer.stage(f"parse ({num_workers} {executor} workers)" if num_workers > 1 else "parse"):
+        partial_results = load_eval_results(list(changed_filepaths), num_workers, executor)
+
+        # Evals whose files changed, under their previous and their new name
+        affected_evals = set()
+        for file_path in list(changed_filepaths) + removed_filepaths:
+            if file_path in manifest.files:
+                affected_evals.add(manifest.files[file_path].eval_result.eval_name)
+        for file_path in removed_filepaths:
+            manifest.remove_file(file_path)
+        for (file_path, sha256), eval_result in zip(changed_filepaths.items(), partial_results):
+            manifest.update_file(file_path, sha256, eval_result)
+            affected_evals.add(eval_result.eval_name)
+
+        # Store results of same eval together, in file order
+        eval_filepaths = defaultdict(list)
+        for file_path in model_result_filepaths:
+            eval_filepaths[manifest.files[file_path].eval_result.eval_name].append(file_path)
+
+    # Hub availability only depends on the model, so it is resolved once per eval rather than once per file
+    with timer.stage("hub status"):
+        first_results = [manifest.files[file_paths[0]].eval_result for file_paths in eval_filepaths.values()]
+        statuses = hub_cache.get_many(
+            [(v.full_model, v.revision or "main") for v in first_results], num_workers=num_workers
+        )
+        hub_cache.start_revalidation()
 
-        for file in files:
-            model_result_filepaths.append(os.path.join(root, file))
+    with timer.stage("derive"):
+        eval_records = {}
+        for (eval_name, file_paths), first_result, status in zip(eval_filepaths.items(), first_results, statuses):
+            request_entry = request_index.finished_request(first_result.full_model, first_result.precision.value.name)
+            request = request_entry.data if request_entry is not None else None
+            hub_status = (status.still_on_hub, status.architecture)
 
-    print(f"Found {len(model_result_filepaths)} JSON files to process.")
+            record = manifest.evals.get(eval_name)
+            if (
+                record is not None
+                and eval_name not in affected_evals
+                and record.request == request
+                and record.hub_status == hub_status
+            ):
+                eval_records[eval_name] = record
+                continue
 
-    eval_results = {}
-    for model_result_filepath in model_result_filepaths:
-        # Creation of result
-        eval_result = EvalResult.init_from_json_file(model_result_filepath)
-        eval_result.update_with_request_file(requests_path)
+            eval_result = merge_eval_results([manifest.files[file_path].eval_result for file_path in file_paths])
+            eval_result.update_with_request_file(requests_path)
+            eval_result.still_on_hub, eval_result.architecture = hub_status
+            try:
+                row = eval_result.info_dict() # we test if the dict version is complete
+            except KeyError:  # not all eval values present
+                row = None
+            eval_records[eval_name] = EvalRecord(eval_result=eval_result, request=request, hub_status=hub_status, row=row)
+            manifest.dirty = True
 
-        # Store results of same eval together
-        eval_name = eval_result.eval_name
-        if eval_name in eval_results.keys():
-            eval_results[eval_name].results.update({k: v for k, v in eval_result.results.items() if v is not None})
-        else:
-            eval_results[eval_name] = eval_result
+        if len(eval_records) != len(manifest.evals):
+            manifest.dirty = True
+        manifest.evals = eval_records
+        results = [record.eval_result for record in eval_records.values() if record.row is not None]
 
-    results = []
-    for v in eval_results.values():
-        try:
-            v.to_dict() # we test if the dict version is complete
-            results.append(v)
-        except KeyError:  # not all eval values present
-            continue
+    with timer.stage("save manifest"):
+        manifest.save()
 
     print(f"Successfully loaded {len(results)} models.")
+    timer.report()
     return results
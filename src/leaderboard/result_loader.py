@@ -0,0 +1,99 @@
+import json
+import os
+import time
+import tracemalloc
+
+from src.envs import RESULT_PARSE_PROFILE, RESULT_STREAMING_THRESHOLD
+
+# Optional faster backends, the stdlib json module is used when they are not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+def _select(data: dict, benchmarks: set) -> dict:
+    results = data.get("results") or {}
+    return {"config": data.get("config"), "results": {k: v for k, v in results.items() if k in benchmarks}}
+
+
+def _load_streaming(json_filepath: str, benchmarks: set) -> dict:
+    """Only materializes `config` and the needed `results` entries, everything else (samples, configs, versions...)
+    is skipped by the parser. The file is read in a single pass, which stops once both have been read: lm-eval writes
+    `config` after `results`, so the whole file is usually read, once."""
+    targets = {"config"} | {f"results.{benchmark}" for benchmark in benchmarks}
+    config, results = None, {}
+    found_config, found_results = False, False
+    target, builder, depth = None, None, 0
+    with open(json_filepath, "rb") as f:
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if target is None:
+                if prefix not in targets:
+                    if prefix == "results" and event == "end_map":
+                        found_results = True
+                        if found_config:
+                            break
+                    continue
+                if event == "map_key":
+                    continue
+                target, builder = prefix, ijson.ObjectBuilder()
+            builder.event(event, value)
+            if event in ("start_map", "start_array"):
+                depth += 1
+            elif event in ("end_map", "end_array"):
+                depth -= 1
+            if depth > 0:
+                continue
+            # The value at the target prefix is complete
+            if target == "config":
+                config, found_config = builder.value, True
+                if found_results:
+                    break
+            else:
+                results[target[len("results."):]] = builder.value
+            target = None
+    return {"config": config, "results": results}
+
+
+def _load_full(json_filepath: str, benchmarks: set) -> dict:
+    with open(json_filepath, "rb") as f:
+        content = f.read()
+    if orjson is not None:
+        try:
+            return _select(orjson.loads(content), benchmarks)
+        except orjson.JSONDecodeError:
+            pass  # orjson rejects NaN/Infinity, which the stdlib accepts
+    return _select(json.loads(content), benchmarks)
+
+
+def load_result_file(json_filepath: str, benchmarks: set) -> dict:
+    """Reads the `config` and the `results` of the given benchmarks from a lm-eval result file.
+    Files above RESULT_STREAMING_THRESHOLD bytes are streamed with ijson when it is installed.
+    With RESULT_PARSE_PROFILE, parse time and peak memory of every file are printed (peak memory is only
+    meaningful when files are parsed one at a time, i.e. INGEST_WORKERS=1)."""
+    if RESULT_PARSE_PROFILE:
+        tracemalloc.start()
+        start = time.perf_counter()
+
+    backend = "orjson" if orjson is not None else "json"
+    if ijson is not None and os.path.getsize(json_filepath) > RESULT_STREAMING_THRESHOLD:
+        try:
+            data = _load_streaming(json_filepath, benchmarks)
+            backend = "ijson"
+        except ijson.JSONError:
+            data = _load_full(json_filepath, benchmarks)
+    else:
+        data = _load_full(json_filepath, benchmarks)
+
+    if RESULT_PARSE_PROFILE:
+        duration = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        size_mb = os.path.getsize(json_filepath) / 1e6
+        print(f"(Parse) {json_filepath}: {size_mb:.1f}MB in {duration * 1000:.1f}ms with {backend}, peak {peak / 1e6:.1f}MB")
+    return data
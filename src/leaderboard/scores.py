@@ -0,0 +1,52 @@
+import numpy as np
+
+from src.display.utils import AutoEvalColumn, Tasks
+
+# Task order of the score matrix columns
+TASKS = [task.value for task in Tasks]
+TASK_BENCHMARKS = [task.benchmark for task in TASKS]
+TASK_COLS = [task.col_name for task in TASKS]
+
+# MCC ranges over [-100, 100]: it is rescaled to [0, 100] for display and for its category average,
+# while the overall average uses the raw scores
+MCC_TASKS = np.array([task.metric == "MCC" for task in TASKS])
+
+# Category average column -> indices of the tasks of that category in the score matrix
+CATEGORY_AVERAGE_COLS = {
+    column.name: np.array([i for i, task in enumerate(TASKS) if task.category == column.category])
+    for attribute, column in AutoEvalColumn.__dict__.items()
+    if attribute.startswith("average_")
+}
+
+
+def score_matrix(eval_results: list) -> np.ndarray:
+    """Models x tasks matrix of raw scores, NaN where a task is missing"""
+    if not eval_results:
+        return np.empty((0, len(TASKS)))
+    return np.stack([eval_result.scores for eval_result in eval_results])
+
+
+def normalize_scores(scores: np.ndarray) -> np.ndarray:
+    """Scores as displayed on the leaderboard"""
+    normalized = scores.copy()
+    normalized[:, MCC_TASKS] = (normalized[:, MCC_TASKS] + 100) / 2.0
+    return normalized
+
+
+def nan_average(scores: np.ndarray) -> np.ndarray:
+    """Row means ignoring NaN, 0 for rows without any score"""
+    valid = ~np.isnan(scores)
+    count = valid.sum(axis=1)
+    total = np.where(valid, scores, 0.0).sum(axis=1)
+    return np.divide(total, count, out=np.zeros(len(scores)), where=count > 0)
+
+
+def score_columns(scores: np.ndarray) -> dict:
+    """All the score columns of the leaderboard (overall average, category averages, tasks) from the raw score matrix"""
+    normalized = normalize_scores(scores)
+    columns = {AutoEvalColumn.average.name: nan_average(scores)}
+    for col_name, task_indices in CATEGORY_AVERAGE_COLS.items():
+        columns[col_name] = nan_average(normalized[:, task_indices])
+    for j, col_name in enumerate(TASK_COLS):
+        columns[col_name] = normalized[:, j]
+    return columns
@@ -0,0 +1,136 @@
+import bisect
+import re
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from src.display.utils import AutoEvalColumn
+
+TRIGRAM = 3
+POSITION_BITS = 16 # trigram postings hold row << POSITION_BITS | position of the trigram in the model id
+TOKEN_SEPARATORS = re.compile(r"[/\-_.\s]+")
+ANCHOR_TEXT = re.compile(r">([^<]*)</a>")
+
+
+def plain_model_id(model_cell: str) -> str:
+    """The org/name shown in a Model cell, without the link markup around it"""
+    match = ANCHOR_TEXT.search(model_cell)
+    return match.group(1) if match else model_cell
+
+
+def parse_query(query: str) -> list:
+    """Terms of a search bar query, separated by ";". A term starting with "^" only matches the beginning of an
+    org or name token, one starting with "~" also matches tokens about one edit away."""
+    return [term.strip() for term in query.split(";") if term.strip() != ""]
+
+
+def deletions(token: str) -> set:
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def _postings(index: dict, dtype) -> dict:
+    return {key: np.array(values, dtype=dtype) for key, values in index.items()}
+
+
+def _sorted_intersection(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Values of the sorted array a also in the sorted array b"""
+    positions = np.searchsorted(b, a)
+    found = positions < len(b)
+    found[found] = b[positions[found]] == a[found]
+    return a[found]
+
+
+class SearchIndex:
+    """Character n-gram and token index over the plain model ids of the leaderboard rows, built once per data
+    generation. A plain term matches the ids containing it, case insensitively, like the str.contains it replaces.
+
+    Terms of up to two characters are looked up directly in the rows holding each 1- and 2-gram. Longer terms are
+    split into trigrams whose postings keep their position, so that shifting and intersecting them gives the exact
+    rows where the trigrams follow each other, without reading the ids again.
+    """
+
+    def __init__(self, model_ids: list):
+        model_ids = [model_id.lower() for model_id in model_ids]
+        self.num_rows = len(model_ids)
+
+        short_ngrams = defaultdict(list)
+        trigrams = defaultdict(list)
+        tokens = defaultdict(list)
+        for row, model_id in enumerate(model_ids):
+            for size in range(1, TRIGRAM):
+                for ngram in {model_id[i:i + size] for i in range(len(model_id) - size + 1)}:
+                    short_ngrams[ngram].append(row)
+            key = row << POSITION_BITS
+            for i in range(min(len(model_id), 1 << POSITION_BITS) - TRIGRAM + 1):
+                trigrams[model_id[i:i + TRIGRAM]].append(key | i)
+            for token in set(TOKEN_SEPARATORS.split(model_id)) - {""}:
+                tokens[token].append(row)
+        self.short_ngrams = _postings(short_ngrams, np.int32)
+        self.trigrams = _postings(trigrams, np.int64)
+        self.tokens = _postings(tokens, np.int32)
+        self.vocabulary = sorted(self.tokens)
+        self._deletion_index = None
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame) -> "SearchIndex":
+        return cls([plain_model_id(cell) for cell in df[AutoEvalColumn.model.name]])
+
+    def search(self, query: str) -> np.ndarray:
+        """Mask of the rows matching any term of the query"""
+        mask = np.zeros(self.num_rows, dtype=bool)
+        for term in parse_query(query.lower()):
+            if term.startswith("^") and len(term) > 1:
+                for token in self._prefixed_tokens(term[1:]):
+                    mask[self.tokens[token]] = True
+            elif term.startswith("~") and len(term) > 1:
+                for token in self._close_tokens(term[1:]):
+                    mask[self.tokens[token]] = True
+            else:
+                mask[self._containing(term)] = True
+        return mask
+
+    def _containing(self, term: str) -> np.ndarray:
+        if len(term) < TRIGRAM:
+            return self.short_ngrams.get(term, np.empty(0, dtype=np.int32))
+
+        # Trigrams covering the term, each shifted back to the position where the term would start
+        offsets = list(range(0, len(term) - TRIGRAM + 1, TRIGRAM))
+        if offsets[-1] != len(term) - TRIGRAM:
+            offsets.append(len(term) - TRIGRAM)
+        postings = []
+        for offset in offsets:
+            positions = self.trigrams.get(term[offset:offset + TRIGRAM])
+            if positions is None:
+                return np.empty(0, dtype=np.int32)
+            postings.append(positions - offset)
+        # Intersected from the rarest trigram. Shifted postings stay sorted, a shift below position 0 lands past the
+        # end of the previous row's positions, where no trigram of an id shorter than 2**POSITION_BITS can be.
+        postings.sort(key=len)
+        starts = postings[0]
+        for shifted in postings[1:]:
+            if len(starts) == 0:
+                break
+            starts = _sorted_intersection(starts, shifted)
+        return starts >> POSITION_BITS
+
+    def _prefixed_tokens(self, prefix: str) -> list:
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = start
+        while end < len(self.vocabulary) and self.vocabulary[end].startswith(prefix):
+            end += 1
+        return self.vocabulary[start:end]
+
+    def _close_tokens(self, term: str) -> set:
+        """Tokens about one edit (insertion, deletion, substitution, transposition) away from the term, found by
+        matching the single-character deletions of both sides. Short terms are only matched exactly."""
+        if self._deletion_index is None:
+            deletion_index = defaultdict(set)
+            for token in self.vocabulary:
+                for variant in deletions(token) | {token}:
+                    deletion_index[variant].add(token)
+            self._deletion_index = deletion_index
+        close_tokens = set()
+        for variant in (deletions(term) if len(term) > 3 else set()) | {term}:
+            close_tokens |= self._deletion_index.get(variant, set())
+        return close_tokens
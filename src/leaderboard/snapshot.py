@@ -0,0 +1,254 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.display.utils import COLS, EVAL_COLS
+from src.envs import EVAL_REQUESTS_PATH, EVAL_RESULTS_PATH, INGEST_MANIFEST_PATH, SNAPSHOT_PATH
+from src.leaderboard.hub_cache import HubStatusCache, get_hub_status_cache, status_fingerprint
+from src.leaderboard.manifest import IngestManifest
+from src.leaderboard.scores import TASK_COLS, score_matrix
+from src.populate import get_evaluation_queue_df, get_leaderboard_df, leaderboard_frame
+
+SNAPSHOT_FORMAT_VERSION = 5
+HEADER_FILE = "header.json"
+
+# Expected columns of each table of a snapshot
+SNAPSHOT_SCHEMA = {
+    "leaderboard": COLS,
+    "scores": TASK_COLS,
+    "finished": EVAL_COLS,
+    "running": EVAL_COLS,
+    "pending": EVAL_COLS,
+}
+
+
+def source_fingerprint(*paths: str) -> str:
+    """Hash of the relative path, size and mtime of every file under the given folders.
+    Hidden files are skipped, snapshot_download rewrites its metadata in .cache on every call."""
+    digest = hashlib.sha256()
+    for path in paths:
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for file in sorted(f for f in files if not f.startswith(".")):
+                file_path = os.path.join(root, file)
+                stat = os.stat(file_path)
+                digest.update(f"{os.path.relpath(file_path, path)}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def snapshot_fingerprint(source: str, hub_statuses: str) -> str:
+    """Fingerprint of a snapshot: the source fingerprint of its files and the hash of the hub statuses shown on its
+    board, which revalidation can change without any file changing"""
+    return f"{source}:{hub_statuses}"
+
+
+def board_hub_statuses(manifest: IngestManifest) -> dict:
+    """Hub statuses of the models on the board by cache key, as the last build of the manifest used them"""
+    return {
+        HubStatusCache.key(record.eval_result.full_model, record.eval_result.revision or "main"): record.hub_status
+        for record in manifest.evals.values()
+        if record.row is not None
+    }
+
+
+def current_fingerprint(source: str, header: dict) -> str:
+    """Fingerprint a snapshot with this header would have if it was built now from files of the given source
+    fingerprint, with the hub statuses currently cached for the models on its board"""
+    return snapshot_fingerprint(source, get_hub_status_cache().fingerprint(header["hub_keys"]))
+
+
+def is_snapshot_current(
+    results_path: str = EVAL_RESULTS_PATH, requests_path: str = EVAL_REQUESTS_PATH, snapshot_path: str = SNAPSHOT_PATH
+) -> bool:
+    """Whether the snapshot was built from the current result and request files and hub statuses"""
+    header = read_snapshot_header(snapshot_path)
+    if header is None:
+        return False
+    return header["fingerprint"] == current_fingerprint(source_fingerprint(results_path, requests_path), header)
+
+
+def _write_column(values: pd.Series, file_path: str) -> dict:
+    """Saves a column as a npy file, and returns how it was encoded"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        np.save(file_path, values.cat.codes.to_numpy())
+        return {"encoding": "category", "categories": values.cat.categories.tolist()}
+    if values.dtype.kind in "biuf":
+        np.save(file_path, values.to_numpy())
+        return {"encoding": "numpy"}
+
+    objects = values.to_numpy(dtype=object)
+    if all(v is None or isinstance(v, str) for v in objects):
+        is_null = np.array([v is None for v in objects], dtype=bool)
+        np.save(file_path, np.array(["" if v is None else v for v in objects], dtype=str))
+        if is_null.any():
+            np.save(f"{file_path}.null.npy", is_null)
+            return {"encoding": "str_nullable"}
+        return {"encoding": "str"}
+
+    # Mixed column, kept value by value
+    np.save(file_path, np.array([json.dumps(v) for v in objects], dtype=str))
+    return {"encoding": "json"}
+
+
+def _read_column(file_path: str, column: dict, mmap: bool):
+    values = np.load(file_path, mmap_mode="r" if mmap else None)
+    encoding = column["encoding"]
+    if encoding == "numpy":
+        return values
+    if encoding == "category":
+        return pd.Categorical.from_codes(values, categories=column["categories"])
+    if encoding == "json":
+        return pd.Series([json.loads(v) for v in values], dtype=object)
+    values = values.astype(object)
+    if encoding == "str_nullable":
+        values[np.load(f"{file_path}.null.npy")] = None
+    return values
+
+
+def write_snapshot(snapshot_path: str, frames: dict, fingerprint: str, hub_keys: list = ()):
+    """Writes the tables to a new snapshot folder, replacing the previous one in a single rename.
+    The folder holds a header.json (format version, fingerprint, hub status keys of the board, schema) and one npy
+    file per column."""
+    tmp_path = f"{snapshot_path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    header = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "fingerprint": fingerprint,
+        "hub_keys": sorted(hub_keys),
+        "created_at": time.time(),
+        "tables": {},
+    }
+    for table_name, df in frames.items():
+        columns = []
+        for i, column in enumerate(df.columns):
+            file_name = f"{table_name}.{i}.npy"
+            encoding = _write_column(df[column], os.path.join(tmp_path, file_name))
+            columns.append({"name": column, "file": file_name, **encoding})
+        header["tables"][table_name] = {"rows": len(df), "columns": columns}
+
+    with open(os.path.join(tmp_path, HEADER_FILE), "w") as f:
+        json.dump(header, f, ensure_ascii=False, indent=1)
+
+    old_path = f"{snapshot_path}.old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(snapshot_path):
+        os.rename(snapshot_path, old_path)
+    os.rename(tmp_path, snapshot_path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def read_snapshot_header(snapshot_path: str) -> dict:
+    """The header of the snapshot, None if there is no readable snapshot with the current format and schema"""
+    try:
+        with open(os.path.join(snapshot_path, HEADER_FILE)) as f:
+            header = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if header.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        return None
+    tables = header.get("tables", {})
+    for table_name, columns in SNAPSHOT_SCHEMA.items():
+        if table_name not in tables or [c["name"] for c in tables[table_name]["columns"]] != columns:
+            return None
+    return header
+
+
+def read_snapshot(snapshot_path: str, fingerprint: str = None, mmap: bool = True) -> dict:
+    """Loads the tables of a snapshot. Returns None if there is none, or if it was built from other sources
+    than the given fingerprint."""
+    header = read_snapshot_header(snapshot_path)
+    if header is None or (fingerprint is not None and header["fingerprint"] != fingerprint):
+        return None
+
+    frames = {}
+    for table_name, table in header["tables"].items():
+        data = {
+            c["name"]: _read_column(os.path.join(snapshot_path, c["file"]), c, mmap)
+            for c in table["columns"]
+        }
+        frames[table_name] = pd.DataFrame(data, columns=[c["name"] for c in table["columns"]], copy=False)
+    return frames
+
+
+def build_frames(results_path: str, requests_path: str, manifest: IngestManifest = None) -> dict:
+    """Builds the leaderboard and queue tables from the result and request files. The scores table holds the raw,
+    unrounded task scores of the leaderboard rows, in the same order."""
+    raw_data, leaderboard_df = get_leaderboard_df(results_path, requests_path, COLS, manifest=manifest)
+    # The leaderboard keeps the positions of its rows in raw_data as index after sorting
+    scores_df = pd.DataFrame(score_matrix(raw_data)[leaderboard_df.index.to_numpy()], columns=TASK_COLS)
+    finished_df, running_df, pending_df = get_evaluation_queue_df(requests_path, EVAL_COLS)
+    return {
+        "leaderboard": leaderboard_df,
+        "scores": scores_df,
+        "finished": finished_df,
+        "running": running_df,
+        "pending": pending_df,
+    }
+
+
+def empty_frames() -> dict:
+    """Tables of the snapshot schema without rows"""
+    return {
+        "leaderboard": leaderboard_frame([], [], COLS),
+        "scores": pd.DataFrame(score_matrix([]), columns=TASK_COLS),
+        "finished": pd.DataFrame(columns=EVAL_COLS),
+        "running": pd.DataFrame(columns=EVAL_COLS),
+        "pending": pd.DataFrame(columns=EVAL_COLS),
+    }
+
+
+def load_or_build_snapshot(
+    results_path: str = EVAL_RESULTS_PATH,
+    requests_path: str = EVAL_REQUESTS_PATH,
+    snapshot_path: str = SNAPSHOT_PATH,
+    manifest_path: str = INGEST_MANIFEST_PATH,
+) -> dict:
+    """Loads the snapshot if it matches the current result and request files and hub statuses, otherwise builds and
+    saves a new one"""
+    source = source_fingerprint(results_path, requests_path)
+    header = read_snapshot_header(snapshot_path)
+    if header is not None:
+        frames = read_snapshot(snapshot_path, current_fingerprint(source, header))
+        if frames is not None:
+            print(f"Loaded leaderboard snapshot from {snapshot_path}")
+            return frames
+
+    print(f"No current leaderboard snapshot in {snapshot_path}, building it")
+    return build_snapshot(results_path, requests_path, snapshot_path, manifest_path, source)
+
+
+def build_snapshot(
+    results_path: str, requests_path: str, snapshot_path: str, manifest_path: str, source: str
+) -> dict:
+    """Builds the tables and saves them as a snapshot of the given source fingerprint, computed before the build"""
+    manifest = IngestManifest.load(manifest_path)
+    frames = build_frames(results_path, requests_path, manifest)
+    # Keyed by the statuses the build used, which the manifest records: the revalidation thread keeps updating the
+    # cache meanwhile, and a status it changed after the lookup must make the snapshot out of date
+    hub_statuses = board_hub_statuses(manifest)
+    write_snapshot(snapshot_path, frames, snapshot_fingerprint(source, status_fingerprint(hub_statuses)), list(hub_statuses))
+    return frames
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the leaderboard snapshot from local result and request files")
+    parser.add_argument("--results-path", default=EVAL_RESULTS_PATH)
+    parser.add_argument("--requests-path", default=EVAL_REQUESTS_PATH)
+    parser.add_argument("--snapshot-path", default=SNAPSHOT_PATH)
+    parser.add_argument("--manifest-path", default=INGEST_MANIFEST_PATH)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    source = source_fingerprint(args.results_path, args.requests_path)
+    frames = build_snapshot(args.results_path, args.requests_path, args.snapshot_path, args.manifest_path, source)
+    duration = time.perf_counter() - start
+    print(f"Wrote snapshot of {len(frames['leaderboard'])} models to {args.snapshot_path} in {duration:.2f}s")
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from src.display.utils import AutoEvalColumn, fields
+
+# Columns the table can be sorted by: averages, task scores, size and likes
+SORTABLE_COLS = [c.name for c in fields(AutoEvalColumn) if c.type == "number"]
+RANK_COL = "Rank"
+
+
+class ColumnOrder:
+    """Sort orders and dense ranks of the leaderboard rows by the values of one column. Sorts are stable, so tied
+    rows keep their table order (by Average), and rows missing the value come last in both directions.
+
+    A filtered view is sorted by walking the precomputed order and keeping the rows of the view, without sorting
+    again.
+    """
+
+    def __init__(self, values: np.ndarray):
+        self.values = values
+        present = np.flatnonzero(~np.isnan(values))
+        missing = np.flatnonzero(np.isnan(values))
+        descending = present[np.argsort(-values[present], kind="stable")]
+        ascending = present[np.argsort(values[present], kind="stable")]
+        self.descending = np.concatenate([descending, missing]).astype(np.int32)
+        self.ascending = np.concatenate([ascending, missing]).astype(np.int32)
+
+        # Dense ranks from the highest value: equal values share a rank, the next value gets the next one.
+        # 0 for rows without a value.
+        self.ranks = np.zeros(len(values), dtype=np.int32)
+        sorted_values = values[descending]
+        self.ranks[descending] = np.cumsum(np.concatenate([[True], sorted_values[1:] != sorted_values[:-1]]))
+        self.num_ranks = int(self.ranks.max()) if len(descending) > 0 else 0
+
+    def order(self, rows: np.ndarray, descending: bool = True) -> np.ndarray:
+        """The given row positions sorted by the column"""
+        order = self.descending if descending else self.ascending
+        selected = np.zeros(len(self.values), dtype=bool)
+        selected[rows] = True
+        return order[selected[order]]
+
+    def top_k(self, rows: np.ndarray, k: int, descending: bool = True) -> np.ndarray:
+        """The first k of the given row positions sorted by the column"""
+        return self.order(rows, descending)[:k]
+
+    def rank(self, rows: np.ndarray, descending: bool = True) -> pd.Series:
+        """Dense ranks of the given rows among all the rows of the table, in the sort direction, missing for rows
+        without a value"""
+        ranks = self.ranks[rows]
+        if not descending:
+            ranks = np.where(ranks > 0, self.num_ranks + 1 - ranks, 0)
+        return pd.Series(pd.array(ranks, dtype="Int64")).mask(ranks == 0)
+
+
+class SortIndex:
+    """Column orders of every sortable column of the leaderboard, built once per data generation"""
+
+    def __init__(self, df: pd.DataFrame):
+        self.columns = {
+            column: ColumnOrder(pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float))
+            for column in SORTABLE_COLS
+            if column in df.columns
+        }
+
+    def order(self, rows: np.ndarray, column: str, descending: bool = True) -> np.ndarray:
+        return self.columns[column].order(rows, descending)
+
+    def top_k(self, rows: np.ndarray, column: str, k: int, descending: bool = True) -> np.ndarray:
+        return self.columns[column].top_k(rows, k, descending)
+
+    def rank(self, rows: np.ndarray, column: str, descending: bool = True) -> pd.Series:
+        return self.columns[column].rank(rows, descending)
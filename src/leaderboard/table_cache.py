@@ -0,0 +1,55 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+
+class TableCache:
+    """LRU cache of the views computed for the most recent filter and search combinations.
+
+    Entries belong to one data generation: the first lookup for a newer generation drops all of them, so a reload
+    of the leaderboard data never serves a view built from the previous one. Handlers still running with an older
+    generation get their views computed without caching, so they do not evict the newer ones. Cached values are
+    shared between sessions and must not be modified.
+    """
+
+    def __init__(self, max_size: int = 128):
+        self.max_size = max_size
+        self.generation_id = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, generation_id: int, key: Hashable, compute: Callable[[], object]):
+        with self._lock:
+            if self.generation_id is None or generation_id > self.generation_id:
+                if self.generation_id is not None:
+                    self.invalidations += 1
+                    print(f"[table cache] dropping generation {self.generation_id}: {self.stats()}")
+                self._entries.clear()
+                self.generation_id = generation_id
+            # An older generation is never looked up nor stored, its handlers compute their views without the cache
+            if generation_id == self.generation_id and key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Computed outside of the lock, two sessions missing on the same key at once both compute it
+        value = compute()
+        with self._lock:
+            if generation_id == self.generation_id and self.max_size > 0:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return value
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
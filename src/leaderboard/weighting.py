@@ -0,0 +1,92 @@
+import math
+import re
+
+import numpy as np
+
+from src.leaderboard.scores import TASK_COLS, TASKS
+from src.leaderboard.sort_index import ColumnOrder
+
+WEIGHTED_COL = "Weighted average ⬆️"
+# Named weight specs offered in the UI, computed once per data generation
+WEIGHT_PRESETS = {
+    "Risk management heavy": "RM=3",
+    "Question answering heavy": "QA=3",
+    "Information extraction heavy": "IE=3",
+    "Forecasting and decision-making": "FO=2, DM=2",
+    "English tasks only": "Spanish=0",
+}
+
+
+def category_code(category: str) -> str:
+    """Short name of a category in weight specs: the code in parentheses, or the whole name"""
+    match = re.search(r"\((\w+)\)", category)
+    return match.group(1) if match else category
+
+
+# Lowercased task and category names accepted in weight specs
+TASK_NAMES = {name.lower(): j for j, name in enumerate(TASK_COLS)}
+CATEGORY_NAMES = {category_code(task.category).lower(): task.category for task in TASKS}
+CATEGORY_NAMES.update({task.category.lower(): task.category for task in TASKS})
+
+
+def parse_weights(spec: str) -> np.ndarray:
+    """Per-task weights of a preset name or of a spec such as "RM=3, FinQA=2". Names are task columns or
+    categories (full names or their code, such as RM), case insensitive. Tasks not mentioned weigh 1, a task weight
+    overrides the weight of its category. Raises a ValueError on an invalid spec."""
+    spec = WEIGHT_PRESETS.get(spec.strip(), spec)
+
+    category_weights, task_weights = {}, {}
+    for entry in re.split(r"[;,]", spec):
+        if entry.strip() == "":
+            continue
+        name, separator, value = entry.partition("=")
+        name = name.strip().lower()
+        try:
+            weight = float(value)
+        except ValueError:
+            weight = math.nan
+        if separator == "" or not math.isfinite(weight) or weight < 0:
+            raise ValueError(f"Invalid weight {entry.strip()!r}, expected a name and a non-negative number like RM=3")
+        if name in TASK_NAMES:
+            task_weights[TASK_NAMES[name]] = weight
+        elif name in CATEGORY_NAMES:
+            category_weights[CATEGORY_NAMES[name]] = weight
+        else:
+            raise ValueError(f"Unknown task or category {name!r}")
+
+    weights = np.array([category_weights.get(task.category, 1.0) for task in TASKS])
+    for j, weight in task_weights.items():
+        weights[j] = weight
+    if not (weights > 0).any():
+        raise ValueError("At least one task needs a positive weight")
+    return weights
+
+
+class WeightedRanking:
+    """Weighted averages of the raw task scores of the leaderboard rows, built once per data generation.
+
+    A weighting is applied with two matrix-vector products, one over the scores with missing values set to 0, one
+    over the mask of present scores, so that each model is averaged over the tasks it has, like Average. With all
+    weights at 1 the result is Average. The presets and equal weights are computed with the generation, keyed by
+    their task weights.
+    """
+
+    def __init__(self, scores: np.ndarray):
+        present = ~np.isnan(scores)
+        self.filled = np.where(present, scores, 0.0)
+        self.present = present.astype(float)
+        self.presets = {
+            tuple(weights): self.ranking(weights)
+            for weights in [parse_weights(spec) for spec in ["", *WEIGHT_PRESETS.values()]]
+        }
+
+    def averages(self, weights: np.ndarray) -> np.ndarray:
+        """Weighted average of each row, rounded like the other score columns, 0 for rows without any weighted
+        score"""
+        total = self.filled @ weights
+        weight_sum = self.present @ weights
+        averages = np.divide(total, weight_sum, out=np.zeros(len(total)), where=weight_sum > 0)
+        return averages.round(decimals=2)
+
+    def ranking(self, weights: np.ndarray) -> ColumnOrder:
+        return ColumnOrder(self.averages(weights))
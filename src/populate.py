@@ -1,81 +1,65 @@
-import json
-import os
 import pandas as pd
 
-from src.display.formatting import has_no_nan_values, make_clickable_model
-from src.display.utils import AutoEvalColumn, EvalQueueColumn
+from src.display.formatting import make_clickable_model
+from src.display.utils import AutoEvalColumn, EvalQueueColumn, ModelType, Precision, WeightType, fields
+from src.leaderboard.manifest import IngestManifest
 from src.leaderboard.read_evals import get_raw_eval_results
+from src.leaderboard.scores import score_columns, score_matrix
+from src.submission.request_index import QUEUES, get_request_index
+
+# Columns holding enum values are stored as categorical codes rather than one string per model
+ENUM_COLUMNS = {
+    AutoEvalColumn.precision.name: [p.value.name for p in Precision],
+    AutoEvalColumn.model_type.name: [t.value.name for t in ModelType],
+    AutoEvalColumn.model_type_symbol.name: [t.value.symbol for t in ModelType],
+    AutoEvalColumn.weight_type.name: [w.value.name for w in WeightType],
+}
+
+
+def get_leaderboard_df(
+    results_path: str, requests_path: str, cols: list, manifest: IngestManifest = None
+) -> pd.DataFrame:
+    """Creates a dataframe from all the individual experiment results.
+    With a persisted manifest, only the results that changed since the previous build are read again."""
+    manifest = manifest if manifest is not None else IngestManifest()
+    raw_data = get_raw_eval_results(results_path, requests_path, manifest=manifest)
+    all_data_json = [manifest.evals[v.eval_name].row for v in raw_data]
+    df = leaderboard_frame(raw_data, all_data_json, cols)
+    return raw_data, df
 
 
-def get_leaderboard_df(results_path: str, requests_path: str, cols: list, benchmark_cols: list) -> pd.DataFrame:
-    """Creates a dataframe from all the individual experiment results"""
-    raw_data = get_raw_eval_results(results_path, requests_path)
-    all_data_json = [v.to_dict() for v in raw_data]
-
-    df = pd.DataFrame.from_records(all_data_json)
-
-    # Add category average columns with default values
-    category_avg_columns = {
-        "Average IE ⬆️": "average_IE",
-        "Average TA ⬆️": "average_TA",
-        "Average QA ⬆️": "average_QA",
-        "Average TG ⬆️": "average_TG",
-        "Average RM ⬆️": "average_RM",
-        "Average FO ⬆️": "average_FO",
-        "Average DM ⬆️": "average_DM",
-        "Average Spanish ⬆️": "average_Spanish"
-    }
+def leaderboard_frame(eval_results: list, all_data_json: list, cols: list) -> pd.DataFrame:
+    """The leaderboard table of the given eval results, from their model information (EvalResult.info_dict)"""
+    info_df = pd.DataFrame.from_records(all_data_json)
+    if info_df.empty:
+        # No results yet: the board keeps its columns, without rows
+        score_cols = score_columns(score_matrix([]))
+        info_df = pd.DataFrame(columns=[c.name for c in fields(AutoEvalColumn) if c.name not in score_cols])
+    for col_name, categories in ENUM_COLUMNS.items():
+        info_df[col_name] = pd.Categorical(info_df[col_name], categories=categories)
 
-    for display_name, internal_name in category_avg_columns.items():
-        df[display_name] = df[internal_name]
+    # Averages and displayed task scores are computed for all models at once from the score matrix.
+    # Missing scores are NaN, so models with partial results stay on the board.
+    scores_df = pd.DataFrame(score_columns(score_matrix(eval_results)), index=info_df.index)
+    df = pd.concat([info_df, scores_df], axis=1)
 
     df = df.sort_values(by=[AutoEvalColumn.average.name], ascending=False)
 
-    # Apply the transformation for MCC values
-    mcc_tasks = ["German", "Australian", "LendingClub", "ccf", "ccfraud", "polish", "taiwan", "portoseguro", "travelinsurance"]
-    for task in mcc_tasks:
-        if task in df.columns:
-            df[task] = (df[task] + 100) / 2.0
-
     # Now, select the columns that were passed to the function
     df = df[cols].round(decimals=2)
-
-    # Filter out if any of the benchmarks have not been produced
-    df = df[has_no_nan_values(df, benchmark_cols)]
-    return raw_data, df
+    return df
 
 
 def get_evaluation_queue_df(save_path: str, cols: list) -> list[pd.DataFrame]:
-    """Creates the different dataframes for the evaluation queues requests"""
-    entries = [entry for entry in os.listdir(save_path) if not entry.startswith(".")]
-    all_evals = []
-
-    for entry in entries:
-        if ".json" in entry:
-            file_path = os.path.join(save_path, entry)
-            with open(file_path) as fp:
-                data = json.load(fp)
-
-            data[EvalQueueColumn.model.name] = make_clickable_model(data["model"])
+    """Creates the finished, running and pending queue dataframes from the queues of the request index"""
+    request_index = get_request_index(save_path)
+    frames = []
+    for queue in QUEUES:
+        rows = []
+        for request_entry in request_index.queues[queue]:
+            data = dict(request_entry.data)
+            data[EvalQueueColumn.model.name] = make_clickable_model(data.get("model", request_entry.model))
             data[EvalQueueColumn.revision.name] = data.get("revision", "main")
-
-            all_evals.append(data)
-        elif ".md" not in entry:
-            # this is a folder
-            sub_entries = [e for e in os.listdir(f"{save_path}/{entry}") if not e.startswith(".")]
-            for sub_entry in sub_entries:
-                file_path = os.path.join(save_path, entry, sub_entry)
-                with open(file_path) as fp:
-                    data = json.load(fp)
-
-                data[EvalQueueColumn.model.name] = make_clickable_model(data["model"])
-                data[EvalQueueColumn.revision.name] = data.get("revision", "main")
-                all_evals.append(data)
-
-    pending_list = [e for e in all_evals if e["status"] in ["PENDING", "RERUN"]]
-    running_list = [e for e in all_evals if e["status"] == "RUNNING"]
-    finished_list = [e for e in all_evals if e["status"].startswith("FINISHED") or e["status"] == "PENDING_NEW_EVAL"]
-    df_pending = pd.DataFrame.from_records(pending_list, columns=cols)
-    df_running = pd.DataFrame.from_records(running_list, columns=cols)
-    df_finished = pd.DataFrame.from_records(finished_list, columns=cols)
-    return df_finished[cols], df_running[cols], df_pending[cols]
+            rows.append(data)
+        frames.append(pd.DataFrame.from_records(rows, columns=cols)[cols])
+    return frames
@@ -0,0 +1,192 @@
+import json
+import os
+import pickle
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+
+REQUEST_FILE_MARKER = "_eval_request_"
+REQUEST_STATE_VERSION = 1
+# Queues shown in the submission tab
+QUEUES = ["finished", "running", "pending"]
+
+
+def queue_of(status: str) -> str:
+    """Queue of a request status, None for statuses that are not shown"""
+    if not isinstance(status, str):
+        return None
+    if status.startswith("FINISHED") or status == "PENDING_NEW_EVAL":
+        return "finished"
+    if status == "RUNNING":
+        return "running"
+    if status in ["PENDING", "RERUN"]:
+        return "pending"
+    return None
+
+
+@dataclass
+class RequestEntry:
+    """One request file of the evaluation queue"""
+    path: str
+    model: str # org/model, as given by the location of the file in the queue
+    depth: int # 0 for files at the root of the queue, 1 for files in an org folder
+    data: dict
+    size: int = 0 # stat of the file when it was read
+    mtime_ns: int = 0
+
+    @property
+    def status(self) -> str:
+        return self.data.get("status", "")
+
+    @property
+    def precision(self) -> str:
+        return self.data.get("precision", "")
+
+
+class RequestIndex:
+    """All request files of the queue, with their requests partitioned by queue.
+
+    The index is rebuilt from the previous one: files whose size and mtime did not change are not read again, and
+    files that are not json requests are remembered as skipped, so they are neither read nor reported again.
+    """
+
+    def __init__(self, requests_path: str, entries: list[RequestEntry], skipped: dict = None):
+        self.requests_path = requests_path
+        self.entries = entries
+        self.skipped = skipped if skipped is not None else {} # path -> (size, mtime_ns) of files that are not requests
+        self.files_read = 0
+        self.changed = True
+        self.by_key = defaultdict(list)
+        self.queues = {queue: [] for queue in QUEUES}
+        for entry in entries:
+            self.by_key[(entry.model, entry.precision, entry.status)].append(entry)
+            queue = queue_of(entry.status)
+            if queue is not None:
+                self.queues[queue].append(entry)
+
+    @classmethod
+    def build(cls, requests_path: str, previous: "RequestIndex" = None) -> "RequestIndex":
+        """Scans the requests folder, reading only the files added or changed since the previous index"""
+        if previous is None or previous.requests_path != requests_path:
+            previous = cls(requests_path, [])
+        known = {entry.path: entry for entry in previous.entries}
+
+        entries, skipped, files_read = [], {}, 0
+        for file_path, depth, stat in scan_request_files(requests_path):
+            file_stat = (stat.st_size, stat.st_mtime_ns)
+            entry = known.get(file_path)
+            if entry is not None and (entry.size, entry.mtime_ns) == file_stat:
+                entries.append(entry)
+                continue
+            if previous.skipped.get(file_path) == file_stat:
+                skipped[file_path] = file_stat
+                continue
+
+            files_read += 1
+            entry = read_request_file(file_path, requests_path, depth)
+            if entry is None:
+                skipped[file_path] = file_stat
+            else:
+                entry.size, entry.mtime_ns = file_stat
+                entries.append(entry)
+
+        index = cls(requests_path, entries, skipped)
+        index.files_read = files_read
+        # Removed files change the number of files, added or modified ones were read
+        index.changed = files_read > 0 or len(entries) + len(skipped) != len(known) + len(previous.skipped)
+        return index
+
+    @classmethod
+    def load(cls, state_path: str, requests_path: str) -> "RequestIndex":
+        """The index saved by a previous run for this requests folder, None if there is no usable one"""
+        if not os.path.exists(state_path):
+            return None
+        try:
+            with open(state_path, "rb") as f:
+                version, saved_requests_path, entries, skipped = pickle.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable request state {state_path}: {e}")
+            return None
+        if version != REQUEST_STATE_VERSION or saved_requests_path != requests_path:
+            return None
+        return cls(requests_path, entries, skipped)
+
+    def save(self, state_path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(state_path)), exist_ok=True)
+        tmp_path = f"{state_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            state = (REQUEST_STATE_VERSION, self.requests_path, self.entries, self.skipped)
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, state_path)
+
+    def counts(self) -> dict:
+        """Number of requests in each queue"""
+        return {queue: len(entries) for queue, entries in self.queues.items()}
+
+    def get(self, model: str, precision: str, status: str) -> list[RequestEntry]:
+        return self.by_key.get((model, precision, status), [])
+
+    def finished_request(self, model: str, precision: str) -> RequestEntry:
+        """The FINISHED request of a model at a given precision, None if there is none.
+        When several match, the first one in file name order is kept."""
+        entries = self.get(model, precision.split(".")[-1], "FINISHED")
+        return min(entries, key=lambda e: e.path) if entries else None
+
+
+def scan_request_files(requests_path: str):
+    """(path, depth, stat) of the files at the root of the queue and in its org folders, in file name order"""
+    if not os.path.isdir(requests_path):
+        return
+    for entry in sorted(os.scandir(requests_path), key=lambda e: e.name):
+        if entry.name.startswith("."):
+            continue
+        if entry.is_file():
+            yield entry.path, 0, entry.stat()
+        elif entry.is_dir():
+            for sub_entry in sorted(os.scandir(entry.path), key=lambda e: e.name):
+                if sub_entry.name.startswith(".") or not sub_entry.is_file():
+                    continue
+                yield sub_entry.path, 1, sub_entry.stat()
+
+
+def read_request_file(file_path: str, requests_path: str, depth: int) -> RequestEntry:
+    """Reads one request file, returns None for anything that is not a readable json request"""
+    if not file_path.endswith(".json"):
+        return None
+    try:
+        with open(file_path) as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Skipping unreadable request file {file_path}: {e}")
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    relative_path = os.path.relpath(file_path, requests_path)
+    model = relative_path.split(REQUEST_FILE_MARKER)[0].replace(os.sep, "/")
+    return RequestEntry(path=file_path, model=model, depth=depth, data=data)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_request_index(requests_path: str, refresh: bool = False, state_path: str = None) -> RequestIndex:
+    """Shared index of a requests folder. It is built on first use and rebuilt only when refresh is True,
+    so all readers of the queue share a single scan per refresh. With a state_path, the index is also kept on disk,
+    so that the first build of a new run only reads the request files that changed since the previous one."""
+    key = os.path.abspath(requests_path)
+    with _indexes_lock:
+        if refresh or key not in _indexes:
+            previous = _indexes.get(key)
+            if previous is None and state_path is not None:
+                previous = RequestIndex.load(state_path, requests_path)
+            index = RequestIndex.build(requests_path, previous)
+            if state_path is not None and (index.changed or previous is None):
+                index.save(state_path)
+            print(
+                f"Request index of {requests_path}: {len(index.entries)} requests {index.counts()}, "
+                f"{index.files_read} files read, {len(index.skipped)} skipped"
+            )
+            _indexes[key] = index
+        return _indexes[key]
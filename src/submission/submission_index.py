@@ -0,0 +1,80 @@
+import os
+import sqlite3
+import threading
+
+from src.submission.request_index import RequestIndex
+
+# Rows mirrored from the request files of the queue, replaced on every sync
+QUEUE_SOURCE = "queue"
+# Rows of the submissions accepted by this app, kept until the files show up in the queue
+SUBMITTED_SOURCE = "submitted"
+
+
+def submission_key(model: str, revision: str, precision: str) -> str:
+    return f"{model}_{revision}_{precision}"
+
+
+class SubmissionIndex:
+    """Models already submitted for evaluation, used to refuse duplicate submissions.
+
+    Backed by a small SQLite database, so that it survives restarts and is ready before the queue is read again.
+    A single connection is shared by the gradio workers behind a lock, and claim checks and records a submission
+    in one statement, so two concurrent submissions of the same model cannot both be accepted.
+    """
+
+    def __init__(self, db_path: str):
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS submissions ("
+                "key TEXT PRIMARY KEY, submitted_time TEXT, source TEXT NOT NULL)"
+            )
+
+    def sync_queue(self, request_index: RequestIndex):
+        """Replaces the queue rows with the requests found in the org folders of the queue, in one transaction"""
+        rows = []
+        for entry in request_index.entries:
+            info = entry.data
+            if entry.depth != 1 or not all(isinstance(info.get(k), str) for k in ["model", "revision", "precision"]):
+                continue
+            key = submission_key(info["model"], info["revision"], info["precision"])
+            rows.append((key, info.get("submitted_time"), QUEUE_SOURCE))
+
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM submissions WHERE source = ?", (QUEUE_SOURCE,))
+            # Submissions of this app now in the queue become queue rows, and go away if their file is removed
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO submissions (key, submitted_time, source) VALUES (?, ?, ?)",
+                rows,
+            )
+
+    def contains(self, model: str, revision: str, precision: str) -> bool:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM submissions WHERE key = ?", (submission_key(model, revision, precision),)
+            ).fetchone()
+        return row is not None
+
+    def claim(self, model: str, revision: str, precision: str, submitted_time: str) -> bool:
+        """Records a new submission, returns False if the model was already submitted"""
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "INSERT OR IGNORE INTO submissions (key, submitted_time, source) VALUES (?, ?, ?)",
+                (submission_key(model, revision, precision), submitted_time, SUBMITTED_SOURCE),
+            )
+        return cursor.rowcount == 1
+
+    def release(self, model: str, revision: str, precision: str):
+        """Forgets a claimed submission that could not be uploaded, so that it can be submitted again"""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM submissions WHERE key = ? AND source = ?",
+                (submission_key(model, revision, precision), SUBMITTED_SOURCE),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM submissions").fetchone()[0]
@@ -3,16 +3,14 @@ import os
 from datetime import datetime, timezone
 
 from src.display.formatting import styled_error, styled_message, styled_warning
-from src.envs import API, EVAL_REQUESTS_PATH, TOKEN, QUEUE_REPO
-from src.submission.check_validity import (
-    already_submitted_models,
-    check_model_card,
-    get_model_size,
-    is_model_on_hub,
-)
+from src.envs import API, EVAL_REQUESTS_PATH, SUBMISSION_INDEX_PATH, QUEUE_REPO
+from src.submission.submission_index import SubmissionIndex
+from src.submission.validation import HubClient, validate_submission
 
-REQUESTED_MODELS = None
-USERS_TO_SUBMISSION_DATES = None
+# Models already submitted, synced from the queue on every data refresh, see app.build_tables
+SUBMISSION_INDEX = SubmissionIndex(SUBMISSION_INDEX_PATH)
+# Hub calls of the submission checks, replaced by a fake to run them without network
+HUB_CLIENT = HubClient()
 
 def add_new_eval(
     model: str,
@@ -22,11 +20,6 @@ def add_new_eval(
     weight_type: str,
     model_type: str,
 ):
-    global REQUESTED_MODELS
-    global USERS_TO_SUBMISSION_DATES
-    if not REQUESTED_MODELS:
-        REQUESTED_MODELS, USERS_TO_SUBMISSION_DATES = already_submitted_models(EVAL_REQUESTS_PATH)
-
     user_name = ""
     model_path = model
     if "/" in model:
@@ -43,34 +36,15 @@ def add_new_eval(
     if revision == "":
         revision = "main"
 
-    # Is the model on the hub?
-    if weight_type in ["Delta", "Adapter"]:
-        base_model_on_hub, error, _ = is_model_on_hub(model_name=base_model, revision=revision, token=TOKEN, test_tokenizer=True)
-        if not base_model_on_hub:
-            return styled_error(f'Base model "{base_model}" {error}')
-
-    if not weight_type == "Adapter":
-        model_on_hub, error, _ = is_model_on_hub(model_name=model, revision=revision, token=TOKEN, test_tokenizer=True)
-        if not model_on_hub:
-            return styled_error(f'Model "{model}" {error}')
-
-    # Is the model info correctly filled?
-    try:
-        model_info = API.model_info(repo_id=model, revision=revision)
-    except Exception:
-        return styled_error("Could not get your model information. Please fill it up properly.")
-
-    model_size = get_model_size(model_info=model_info, precision=precision)
-
-    # Were the model card and license filled?
-    try:
-        license = model_info.cardData["license"]
-    except Exception:
-        return styled_error("Please select a license for your model")
+    # Refuse known duplicates before any hub call, the claim below settles concurrent submissions
+    if SUBMISSION_INDEX.contains(model, revision, precision):
+        return styled_warning("This model has been already submitted.")
 
-    modelcard_OK, error_msg = check_model_card(model)
-    if not modelcard_OK:
-        return styled_error(error_msg)
+    # Is the model on the hub, and are its info, model card and license filled?
+    validation = validate_submission(model, base_model, revision, precision, weight_type, client=HUB_CLIENT)
+    validation.report(model)
+    if not validation.ok:
+        return styled_error(validation.error)
 
     # Seems good, creating the eval
     print("Adding new eval")
@@ -84,32 +58,37 @@ def add_new_eval(
         "status": "PENDING",
         "submitted_time": current_time,
         "model_type": model_type,
-        "likes": model_info.likes,
-        "params": model_size,
-        "license": license,
+        "likes": validation.likes,
+        "params": validation.model_size,
+        "license": validation.license,
         "private": False,
     }
 
-    # Check for duplicate submission
-    if f"{model}_{revision}_{precision}" in REQUESTED_MODELS:
+    # Check for duplicate submission, and record this one if it is not
+    if not SUBMISSION_INDEX.claim(model, revision, precision, current_time):
         return styled_warning("This model has been already submitted.")
 
-    print("Creating eval file")
-    OUT_DIR = f"{EVAL_REQUESTS_PATH}/{user_name}"
-    os.makedirs(OUT_DIR, exist_ok=True)
-    out_path = f"{OUT_DIR}/{model_path}_eval_request_False_{precision}_{weight_type}.json"
-
-    with open(out_path, "w") as f:
-        f.write(json.dumps(eval_entry))
-
-    print("Uploading eval file")
-    API.upload_file(
-        path_or_fileobj=out_path,
-        path_in_repo=out_path.split("eval-queue/")[1],
-        repo_id=QUEUE_REPO,
-        repo_type="dataset",
-        commit_message=f"Add {model} to eval queue",
-    )
+    try:
+        print("Creating eval file")
+        OUT_DIR = f"{EVAL_REQUESTS_PATH}/{user_name}"
+        os.makedirs(OUT_DIR, exist_ok=True)
+        out_path = f"{OUT_DIR}/{model_path}_eval_request_False_{precision}_{weight_type}.json"
+
+        with open(out_path, "w") as f:
+            f.write(json.dumps(eval_entry))
+
+        print("Uploading eval file")
+        API.upload_file(
+            path_or_fileobj=out_path,
+            path_in_repo=out_path.split("eval-queue/")[1],
+            repo_id=QUEUE_REPO,
+            repo_type="dataset",
+            commit_message=f"Add {model} to eval queue",
+        )
+    except Exception:
+        # Not in the queue, it can be submitted again
+        SUBMISSION_INDEX.release(model, revision, precision)
+        raise
 
     # Remove the local file
     os.remove(out_path)
@@ -0,0 +1,145 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable
+
+from src.envs import API, SUBMISSION_CHECK_TIMEOUT, TOKEN
+from src.submission.check_validity import check_model_card, get_model_size, is_model_on_hub
+
+
+class HubClient:
+    """Hub calls made to validate a submission. Replace it with a fake to validate submissions without network."""
+
+    def model_on_hub(self, model: str, revision: str) -> tuple[bool, str]:
+        """Whether the model config and tokenizer can be loaded, with the reason when they cannot"""
+        on_hub, error, _ = is_model_on_hub(model_name=model, revision=revision, token=TOKEN, test_tokenizer=True)
+        return on_hub, error
+
+    def model_info(self, model: str, revision: str):
+        return API.model_info(repo_id=model, revision=revision)
+
+    def model_card(self, model: str) -> tuple[bool, str]:
+        return check_model_card(model)
+
+
+@dataclass
+class Validation:
+    """Outcome of the checks of a submission: the first error found, or the model info needed for its request"""
+    error: str = None
+    model_size: float = 0
+    likes: int = 0
+    license: str = None
+    # Seconds taken by each check, None for the checks cancelled or abandoned after the first error
+    latencies: dict = field(default_factory=dict)
+    duration: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def report(self, model: str):
+        checks = " | ".join(
+            f"{name} {'-' if latency is None else f'{latency:.3f}s'}" for name, latency in self.latencies.items()
+        )
+        outcome = "ok" if self.ok else f"refused: {self.error}"
+        print(f"[validate {model}] {checks} | total {self.duration:.3f}s | {outcome}")
+
+
+def validate_submission(
+    model: str,
+    base_model: str,
+    revision: str,
+    precision: str,
+    weight_type: str,
+    client: HubClient,
+    timeout: float = SUBMISSION_CHECK_TIMEOUT,
+    num_workers: int = None,
+) -> Validation:
+    """Runs the hub checks of a submission concurrently, and returns as soon as one of them fails.
+
+    Each check gets `timeout` seconds from its start, a check running longer fails the submission. Checks still
+    running after a failure are abandoned in their thread and their result ignored. With num_workers=1 the checks
+    run one after the other in the order below, like they used to.
+    """
+    validation = Validation()
+
+    def check_base_model():
+        on_hub, error = client.model_on_hub(base_model, revision)
+        return None if on_hub else f'Base model "{base_model}" {error}'
+
+    def check_model():
+        on_hub, error = client.model_on_hub(model, revision)
+        return None if on_hub else f'Model "{model}" {error}'
+
+    def check_model_info():
+        try:
+            model_info = client.model_info(model, revision)
+        except Exception:
+            return "Could not get your model information. Please fill it up properly."
+        validation.model_size = get_model_size(model_info=model_info, precision=precision)
+        validation.likes = model_info.likes
+        try:
+            validation.license = model_info.cardData["license"]
+        except Exception:
+            return "Please select a license for your model"
+        return None
+
+    def check_card():
+        card_ok, error = client.model_card(model)
+        return None if card_ok else error
+
+    checks = {}
+    if weight_type in ["Delta", "Adapter"]:
+        checks["base model on hub"] = check_base_model
+    if not weight_type == "Adapter":
+        checks["model on hub"] = check_model
+    checks["model info"] = check_model_info
+    checks["model card"] = check_card
+
+    start = time.perf_counter()
+    validation.error, validation.latencies = run_checks(checks, timeout, num_workers or len(checks))
+    validation.duration = time.perf_counter() - start
+    return validation
+
+
+def run_checks(checks: dict[str, Callable[[], str]], timeout: float, num_workers: int) -> tuple[str, dict]:
+    """Runs checks returning an error message or None, and returns the first error and the latency of each check.
+    Errors of checks finishing together are reported in the order of the checks."""
+    started, latencies = {}, {name: None for name in checks}
+
+    def run(name: str, check: Callable[[], str]) -> str:
+        started[name] = time.perf_counter()
+        try:
+            return check()
+        except Exception as e:
+            print(f"Submission check {name} failed: {e!r}")
+            return f"Could not check the {name}, please try again later."
+        finally:
+            latencies[name] = time.perf_counter() - started[name]
+
+    pool = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="submission-check")
+    futures = {pool.submit(run, name, check): name for name, check in checks.items()}
+    pending, error = set(futures), None
+    try:
+        while pending and error is None:
+            now = time.perf_counter()
+            deadlines = [started[futures[f]] + timeout - now for f in pending if futures[f] in started]
+            if len(deadlines) < len(pending):
+                # A queued check has no deadline yet, poll until it starts
+                deadlines.append(0.05)
+            wait_time = min(deadlines)
+            done, pending = wait(pending, timeout=max(wait_time, 0), return_when=FIRST_COMPLETED)
+            errors = [futures[f] for f in done if f.result() is not None]
+            if errors:
+                first = min(errors, key=list(checks).index)
+                error = next(f.result() for f in done if futures[f] == first)
+                break
+            now = time.perf_counter()
+            late = [futures[f] for f in pending if futures[f] in started and now - started[futures[f]] >= timeout]
+            if late:
+                name = min(late, key=list(checks).index)
+                error = f"Could not check the {name} within {timeout:g}s, please try again later."
+    finally:
+        # Does not wait for the abandoned checks, the queued ones are not started
+        pool.shutdown(wait=False, cancel_futures=True)
+    return error, {name: latencies[name] for name in checks}
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import shutil
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+from huggingface_hub import hf_hub_download
+
+from src.envs import (
+    API,
+    EVAL_REQUESTS_PATH,
+    EVAL_RESULTS_PATH,
+    LOCAL_DATA_SOURCE,
+    QUEUE_REPO,
+    RESULTS_REPO,
+    SYNC_STATE_PATH,
+    TOKEN,
+)
+from src.leaderboard.manifest import file_sha256
+
+
+def git_blob_sha1(file_path: str) -> str:
+    """Hash git gives to the content of a file, which is what the hub reports for files not stored with LFS"""
+    digest = hashlib.sha1(f"blob {os.path.getsize(file_path)}\0".encode())
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Content hashes are stored as "<kind>:<hex digest>", so that a local file can be checked against any of them
+HASH_FUNCTIONS = {"sha256": file_sha256, "git-sha1": git_blob_sha1}
+
+
+def local_file_matches(file_path: str, content_hash: str) -> bool:
+    kind, _, digest = content_hash.partition(":")
+    return os.path.isfile(file_path) and HASH_FUNCTIONS[kind](file_path) == digest
+
+
+class DatasetSource(ABC):
+    """Remote copy of a dataset the app reads from"""
+
+    @abstractmethod
+    def revision(self) -> str:
+        """Identifier of the current state of the dataset, which changes whenever one of its files does"""
+
+    @abstractmethod
+    def list_files(self, revision: str) -> dict:
+        """Relative path -> content hash of every file of the dataset at the given revision"""
+
+    @abstractmethod
+    def fetch(self, path: str, local_dir: str, revision: str):
+        """Writes the file at `path` to the same relative path under local_dir"""
+
+
+@dataclass
+class HubDatasetSource(DatasetSource):
+    repo_id: str
+    token: str = None
+
+    def revision(self) -> str:
+        return API.dataset_info(self.repo_id, token=self.token).sha
+
+    def list_files(self, revision: str) -> dict:
+        info = API.dataset_info(self.repo_id, revision=revision, files_metadata=True, token=self.token)
+        return {
+            sibling.rfilename: f"sha256:{sibling.lfs['sha256']}" if sibling.lfs else f"git-sha1:{sibling.blob_id}"
+            for sibling in info.siblings
+        }
+
+    def fetch(self, path: str, local_dir: str, revision: str):
+        hf_hub_download(
+            repo_id=self.repo_id,
+            filename=path,
+            repo_type="dataset",
+            revision=revision,
+            local_dir=local_dir,
+            etag_timeout=30,
+            token=self.token,
+        )
+
+
+@dataclass
+class LocalDatasetSource(DatasetSource):
+    """Folder standing in for a hub dataset, for tests and offline runs"""
+    path: str
+
+    def revision(self) -> str:
+        # Without a commit history, the revision is derived from the stat of every file
+        digest = hashlib.sha256()
+        for path in self._walk():
+            stat = os.stat(os.path.join(self.path, path))
+            digest.update(f"{path}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+        return digest.hexdigest()
+
+    def list_files(self, revision: str) -> dict:
+        return {path: f"sha256:{file_sha256(os.path.join(self.path, path))}" for path in self._walk()}
+
+    def fetch(self, path: str, local_dir: str, revision: str):
+        local_path = os.path.join(local_dir, path)
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        shutil.copyfile(os.path.join(self.path, path), f"{local_path}.tmp")
+        os.replace(f"{local_path}.tmp", local_path)
+
+    def _walk(self) -> list:
+        if not os.path.isdir(self.path):
+            raise FileNotFoundError(f"No dataset folder at {self.path}")
+        paths = []
+        for root, dirs, files in os.walk(self.path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for file in sorted(f for f in files if not f.startswith(".")):
+                paths.append(os.path.relpath(os.path.join(root, file), self.path))
+        return paths
+
+
+@dataclass
+class SyncReport:
+    """What a sync changed in a local folder, paths are relative to it"""
+    local_dir: str
+    revision: str
+    added: list = field(default_factory=list)
+    changed: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+
+    @property
+    def paths(self) -> list:
+        return self.added + self.changed + self.removed
+
+    def __str__(self):
+        return (
+            f"{self.local_dir} at {self.revision[:12]}: "
+            f"{len(self.added)} added, {len(self.changed)} changed, {len(self.removed)} removed"
+        )
+
+
+class DeltaSync:
+    """Keeps a local folder identical to a dataset source, transferring only the files that changed.
+
+    The revision and the content hash of every file of the last sync are saved in a state file: when the revision
+    did not move nothing is listed, otherwise only files whose hash differs are fetched and files gone from the
+    source are deleted. Files already on disk with the right content (e.g. from a previous full download) are kept.
+    """
+
+    def __init__(self, source: DatasetSource, local_dir: str, state_path: str):
+        self.source = source
+        self.local_dir = local_dir
+        self.state_path = state_path
+
+    def load_state(self) -> dict:
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"revision": None, "files": {}}
+
+    def save_state(self, state: dict):
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def sync(self) -> SyncReport:
+        state = self.load_state()
+        revision = self.source.revision()
+        report = SyncReport(self.local_dir, revision)
+        if revision == state["revision"]:
+            return report
+
+        remote_files = self.source.list_files(revision)
+        for path, content_hash in remote_files.items():
+            local_path = os.path.join(self.local_dir, path)
+            known_hash = state["files"].get(path)
+            if known_hash == content_hash and os.path.isfile(local_path):
+                continue
+            if known_hash is None and local_file_matches(local_path, content_hash):
+                continue
+            self.source.fetch(path, self.local_dir, revision)
+            (report.added if known_hash is None else report.changed).append(path)
+
+        for path in state["files"].keys() - remote_files.keys():
+            local_path = os.path.join(self.local_dir, path)
+            if os.path.isfile(local_path):
+                os.remove(local_path)
+            report.removed.append(path)
+
+        self.save_state({"revision": revision, "files": remote_files})
+        return report
+
+
+def get_dataset_sources() -> dict:
+    """Local folder -> source it is synced from. With LOCAL_DATA_SOURCE set, the requests and results are copied
+    from its `requests` and `results` subfolders instead of the hub datasets."""
+    if LOCAL_DATA_SOURCE:
+        return {
+            EVAL_REQUESTS_PATH: LocalDatasetSource(os.path.join(LOCAL_DATA_SOURCE, "requests")),
+            EVAL_RESULTS_PATH: LocalDatasetSource(os.path.join(LOCAL_DATA_SOURCE, "results")),
+        }
+    return {
+        EVAL_REQUESTS_PATH: HubDatasetSource(QUEUE_REPO, TOKEN),
+        EVAL_RESULTS_PATH: HubDatasetSource(RESULTS_REPO, TOKEN),
+    }
+
+
+def sync_datasets(sources: dict = None) -> list:
+    """Brings every local folder up to date with its source, returns the local paths that changed"""
+    changed_paths = []
+    for local_dir, source in (sources or get_dataset_sources()).items():
+        state_path = os.path.join(SYNC_STATE_PATH, f"{os.path.basename(os.path.normpath(local_dir))}.json")
+        report = DeltaSync(source, local_dir, state_path).sync()
+        print(f"Synced {report}")
+        changed_paths.extend(os.path.join(local_dir, path) for path in report.paths)
+    return changed_paths
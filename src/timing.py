@@ -0,0 +1,56 @@
+import builtins
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """Collects wall-clock durations of named stages and prints them as a single report line"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, stage_name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage_name, time.perf_counter() - start)
+
+    def add(self, stage_name: str, duration: float):
+        self.stages[stage_name] = self.stages.get(stage_name, 0.0) + duration
+
+    @property
+    def total(self) -> float:
+        return sum(self.stages.values())
+
+    def report(self):
+        timings = " | ".join(f"{stage_name} {duration:.3f}s" for stage_name, duration in self.stages.items())
+        print(f"[{self.name}] {timings} | total {self.total:.3f}s")
+
+
+@contextmanager
+def timed_imports(timer: StageTimer):
+    """Adds a stage to the timer for every module imported for the first time inside the block, with the time of its
+    own imports included. Modules imported while another one is loading are counted in the outermost one."""
+    original_import = builtins.__import__
+    state = threading.local()
+
+    def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+        if level > 0 or name in sys.modules or getattr(state, "depth", 0) > 0:
+            return original_import(name, globals, locals, fromlist, level)
+        state.depth = 1
+        try:
+            with timer.stage(f"import {name}"):
+                return original_import(name, globals, locals, fromlist, level)
+        finally:
+            state.depth = 0
+
+    builtins.__import__ = timed_import
+    try:
+        yield
+    finally:
+        builtins.__import__ = original_import